@@ -1,10 +1,163 @@
+import time
+INICIO_APP = time.perf_counter()
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, colorchooser
-import pandas as pd
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from tkinter import ttk, filedialog, messagebox, colorchooser, simpledialog
+import argparse
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from itertools import cycle
 import processamento
+
+# Inicialização rápida: a janela abre só com Tk + NumPy. O Matplotlib é
+# importado numa thread depois que a janela aparece (o gráfico é montado em
+# seguida) e pandas/SciPy/chardet são pré-aquecidos em segundo plano; o
+# Plotly fica para o primeiro gráfico avançado. Relatório de importação:
+# python app.py --importacoes (ou na janela Desempenho).
+MODULOS_PREAQUECIMENTO = ('pandas', 'scipy.signal', 'chardet')
+
+# Controles de parâmetros da janela principal: (chave, rótulo, mínimo, máximo, passo)
+CONTROLES_PARAMETROS = [
+    ('baseline_order', "Ordem da baseline", 0, 8, 1),
+    ('window_size', "Janela Savitzky-Golay", 3, 101, 1),
+    ('savgol_order', "Ordem Savitzky-Golay", 1, 6, 1),
+    ('prominence', "Proeminência", 0.001, 0.2, 0.001),
+    ('distance', "Distância (pontos)", 1, 100, 1),
+]
+# Espera depois da última mudança num controle antes de reprocessar
+ATRASO_PARAMETROS_MS = 120
+
+def importar_matplotlib():
+    # Roda fora da thread do Tk: só importa, não cria nenhum widget
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return Figure, FigureCanvasTkAgg
+
+def criar_canvas(figura, master, FigureCanvasTkAgg):
+    # Canvas que registra o tempo de cada desenho completo do Matplotlib
+    class CanvasInstrumentado(FigureCanvasTkAgg):
+        def draw(self):
+            with processamento.instrumentacao.etapa('matplotlib_desenho'):
+                super().draw()
+    return CanvasInstrumentado(figura, master=master)
+
+# Agendador de tarefas em segundo plano -------------
+# O trabalho pesado (leitura, processamento, exportação, HTML do Plotly) roda
+# num pool de threads; os resultados voltam por uma fila lida com after(),
+# então os callbacks, que mexem em widgets, rodam sempre na thread do Tk.
+# Cada tarefa tem uma chave: agendar de novo a mesma chave cancela a anterior
+# e descarta o resultado dela (cliques rápidos na lista viram uma só
+# atualização).
+
+class Tarefa:
+    # Entregue à função de trabalho: permite checar o cancelamento e mandar
+    # resultados parciais para a interface
+    def __init__(self, fila, chave, descricao):
+        self.chave = chave
+        self.descricao = descricao
+        self.cancelar = threading.Event()
+        self._fila = fila
+
+    def cancelada(self):
+        return self.cancelar.is_set()
+
+    def parcial(self, valor):
+        self._fila.put((self, 'parcial', valor))
+
+class Agendador:
+    def __init__(self, raiz, max_workers=3, intervalo_ms=30, ao_mudar=None):
+        self.raiz = raiz
+        self.intervalo_ms = intervalo_ms
+        self.ao_mudar = ao_mudar  # Chamado quando o conjunto de tarefas ativas muda
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ftir')
+        self._fila = queue.Queue()
+        self._atuais = {}  # chave -> (Tarefa, ao_concluir, ao_parcial, ao_falhar)
+        self._futuros = set()  # Ainda no pool (inclusive tarefas já substituídas)
+        self._consultando = False
+
+    def agendar(self, chave, trabalho, ao_concluir=None, ao_parcial=None, ao_falhar=None, descricao=''):
+        # trabalho(tarefa) roda fora do loop do Tk; os callbacks rodam nele
+        anterior = self._atuais.pop(chave, None)
+        if anterior is not None:
+            anterior[0].cancelar.set()
+        tarefa = Tarefa(self._fila, chave, descricao)
+        self._atuais[chave] = (tarefa, ao_concluir, ao_parcial, ao_falhar)
+        futuro = self._executor.submit(self._executar, tarefa, trabalho)
+        self._futuros.add(futuro)
+        futuro.add_done_callback(self._futuros.discard)
+        self._notificar()
+        if not self._consultando:
+            self._consultando = True
+            self.raiz.after(self.intervalo_ms, self._consultar)
+        return tarefa
+
+    def cancelar(self, chave):
+        # Pede para a tarefa parar; diferente de agendar por cima, o resultado
+        # (parcial) ainda é entregue para a interface poder finalizar
+        registro = self._atuais.get(chave)
+        if registro is not None:
+            registro[0].cancelar.set()
+
+    def ocupado(self, chave):
+        return chave in self._atuais
+
+    def descricoes(self):
+        return [registro[0].descricao for registro in self._atuais.values()]
+
+    def encerrar(self):
+        for registro in self._atuais.values():
+            registro[0].cancelar.set()
+        self._atuais.clear()
+        # Descarta o que ainda não começou (cancel_futures=True só existe no 3.9+)
+        for futuro in list(self._futuros):
+            futuro.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _executar(self, tarefa, trabalho):
+        try:
+            resultado = trabalho(tarefa)
+        except Exception as erro:
+            self._fila.put((tarefa, 'erro', erro))
+        else:
+            self._fila.put((tarefa, 'ok', resultado))
+
+    def _notificar(self):
+        if self.ao_mudar:
+            self.ao_mudar()
+
+    def _consultar(self):
+        mudou = False
+        try:
+            while True:
+                tarefa, tipo, valor = self._fila.get_nowait()
+                registro = self._atuais.get(tarefa.chave)
+                if registro is None or registro[0] is not tarefa:
+                    continue  # Tarefa substituída: resultado velho é descartado
+                _, ao_concluir, ao_parcial, ao_falhar = registro
+                mudou = True
+                if tipo == 'parcial':
+                    if ao_parcial:
+                        ao_parcial(valor)
+                    continue
+                del self._atuais[tarefa.chave]
+                if tipo == 'ok':
+                    if ao_concluir:
+                        ao_concluir(valor)
+                elif ao_falhar:
+                    ao_falhar(valor)
+                else:
+                    messagebox.showerror("Erro", f"{tarefa.descricao or tarefa.chave}: {valor}")
+        except queue.Empty:
+            pass
+        finally:
+            if mudou:
+                self._notificar()
+            if self._atuais:
+                self.raiz.after(self.intervalo_ms, self._consultar)
+            else:
+                self._consultando = False
+
 # Painel Interativo Principal
 class AppFTIR(tk.Tk):
     def __init__(self):
@@ -13,10 +166,18 @@ class AppFTIR(tk.Tk):
         self.geometry("1300x800")
 
         self.datasets_carregados = {}
-        self.dataset_cores = {}  # NOVO: Para cores consistentes
+        # Parâmetros da sessão (gravados no projeto junto com as amostras)
+        self.parametros_processamento = dict(processamento.PARAMETROS_PADRAO)
+        self.parametros_plotly = {'titulo': "Espectros FTIR Comparados", 'modo_leve': True, 'max_pontos': 4000, 'logo': None}
+        self.agendador = Agendador(self, ao_mudar=self._atualizar_status)
+        self.mensagem_status = "Pronto"
         # Paleta de cores a ser usada para os gráficos
         self.cores_ciclo = cycle(["#3079ae", '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'])
 
+        # --- Barra de status (tarefas em andamento) ---
+        self.status = tk.StringVar(value=self.mensagem_status)
+        ttk.Label(self, textvariable=self.status, relief=tk.SUNKEN, anchor='w', padding=(5, 2)).pack(side=tk.BOTTOM, fill=tk.X)
+
         # --- Frames Principais ---
         frame_esquerda = ttk.Frame(self)
         frame_esquerda.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
@@ -30,6 +191,17 @@ class AppFTIR(tk.Tk):
         frame_arquivos = ttk.LabelFrame(frame_esquerda, text="1. Arquivos")
         frame_arquivos.pack(fill=tk.X, pady=5)
         ttk.Button(frame_arquivos, text="Carregar Arquivos", command=self.carregar_arquivos).pack(fill=tk.X, padx=5, pady=5)
+        frame_projeto = ttk.Frame(frame_arquivos)
+        frame_projeto.pack(fill=tk.X, padx=5)
+        ttk.Button(frame_projeto, text="Abrir Projeto", command=self.abrir_projeto).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(frame_projeto, text="Salvar Projeto", command=self.salvar_projeto).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+
+        frame_progresso = ttk.Frame(frame_arquivos)
+        frame_progresso.pack(fill=tk.X, padx=5)
+        self.barra_progresso = ttk.Progressbar(frame_progresso, mode='determinate')
+        self.barra_progresso.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.btn_cancelar = ttk.Button(frame_progresso, text="Cancelar", width=9, command=lambda: self.agendador.cancelar('carregamento'), state=tk.DISABLED)
+        self.btn_cancelar.pack(side=tk.RIGHT, padx=(5, 0))
         
         self.lista_datasets = tk.Listbox(frame_arquivos, selectmode=tk.MULTIPLE, height=10, exportselection=False)
         self.lista_datasets.pack(fill=tk.X, expand=True, padx=5, pady=5)
@@ -44,28 +216,57 @@ class AppFTIR(tk.Tk):
         self.show_picos = tk.BooleanVar(value=True)
         
         # CORREÇÃO: Checkboxes agora atualizam o gráfico automaticamente
-        ttk.Checkbutton(frame_visualizacao, text="Mostrar Espectro Original", variable=self.show_original, command=self.atualizar_visualizacao).pack(anchor='w', padx=5)
-        ttk.Checkbutton(frame_visualizacao, text="Mostrar Espectro Processado", variable=self.show_processado, command=self.atualizar_visualizacao).pack(anchor='w', padx=5)
-        ttk.Checkbutton(frame_visualizacao, text="Mostrar Picos", variable=self.show_picos, command=self.atualizar_visualizacao).pack(anchor='w', padx=5)
+        ttk.Checkbutton(frame_visualizacao, text="Mostrar Espectro Original", variable=self.show_original, command=self.agendar_atualizacao).pack(anchor='w', padx=5)
+        ttk.Checkbutton(frame_visualizacao, text="Mostrar Espectro Processado", variable=self.show_processado, command=self.agendar_atualizacao).pack(anchor='w', padx=5)
+        ttk.Checkbutton(frame_visualizacao, text="Mostrar Picos", variable=self.show_picos, command=self.agendar_atualizacao).pack(anchor='w', padx=5)
 
-        ttk.Button(frame_visualizacao, text="Atualizar Gráfico Manualmente", command=self.atualizar_visualizacao).pack(fill=tk.X, padx=5, pady=10)
+        ttk.Button(frame_visualizacao, text="Atualizar Gráfico Manualmente", command=self.agendar_atualizacao).pack(fill=tk.X, padx=5, pady=10)
 
         frame_acoes = ttk.LabelFrame(frame_esquerda, text="3. Ações")
         frame_acoes.pack(fill=tk.X, pady=5)
         ttk.Button(frame_acoes, text="Exportar Picos Selecionados", command=self.exportar_picos).pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(frame_acoes, text="Comparar Bandas de Referência", command=self.comparar_bandas).pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(frame_acoes, text="Criar Biblioteca (selecionados)", command=self.criar_biblioteca).pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(frame_acoes, text="Buscar na Biblioteca", command=self.buscar_biblioteca).pack(fill=tk.X, padx=5, pady=5)
         ttk.Button(frame_acoes, text="Salvar Imagem do Gráfico", command=self.salvar_grafico).pack(fill=tk.X, padx=5, pady=5)
         ttk.Button(frame_acoes, text="Gráfico Avançado (Plotly)", command=self.abrir_janela_plot_avancado).pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(frame_acoes, text="Desempenho", command=lambda: JanelaDesempenho(self)).pack(fill=tk.X, padx=5, pady=5)
 
         # ==================================================================
         # ÁREA DE VISUALIZAÇÃO (DIREITA)
         # ==================================================================
-        plot_frame = ttk.Frame(frame_direita)
-        plot_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        # Parâmetros do processamento: depois de uma pausa curta, só as etapas
+        # seguintes à que mudou são refeitas (ver CacheProcessamento)
+        frame_parametros = ttk.LabelFrame(frame_direita, text="Parâmetros de Processamento")
+        frame_parametros.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        self.controles_parametros = {}
+        self.atualizacao_pendente = None
 
-        self.figura = Figure(figsize=(8, 6))
-        self.ax_plot = self.figura.add_subplot(111)
-        self.canvas = FigureCanvasTkAgg(self.figura, master=plot_frame)
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        frame_metodo = ttk.Frame(frame_parametros)
+        frame_metodo.grid(row=0, column=0, sticky='w', padx=5)
+        ttk.Label(frame_metodo, text="Baseline:").pack(anchor='w')
+        combo_metodo = ttk.Combobox(frame_metodo, values=processamento.METODOS_BASELINE, state='readonly', width=14)
+        combo_metodo.pack(anchor='w')
+        combo_metodo.bind('<<ComboboxSelected>>', lambda e: self._parametro_alterado('baseline_metodo', combo_metodo.get()))
+        self.controles_parametros['baseline_metodo'] = combo_metodo
+
+        for posicao, (chave, rotulo, minimo, maximo, passo) in enumerate(CONTROLES_PARAMETROS, 1):
+            escala = tk.Scale(frame_parametros, label=rotulo, from_=minimo, to=maximo, resolution=passo,
+                              orient=tk.HORIZONTAL, length=180,
+                              command=lambda valor, chave=chave: self._parametro_alterado(chave, valor))
+            escala.grid(row=posicao // 3, column=posicao % 3, sticky='w', padx=5)
+            self.controles_parametros[chave] = escala
+        self._sincronizar_controles()
+
+        # O gráfico é montado em _montar_grafico, depois que a janela aparece
+        self.plot_frame = ttk.Frame(frame_direita)
+        self.plot_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.lbl_carregando = ttk.Label(self.plot_frame, text="Carregando gráfico...", anchor='center')
+        self.lbl_carregando.pack(fill=tk.BOTH, expand=True)
+        self.figura = self.ax_plot = self.canvas = None
+        self.artistas = {}       # nome -> linhas do Matplotlib + dados completos
+        self.linhas_tabela = {}  # nome -> (picos mostrados, ids das linhas na tabela)
+        self.legenda_atual = None
 
         table_frame = ttk.Frame(frame_direita)
         table_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=10)
@@ -82,124 +283,476 @@ class AppFTIR(tk.Tk):
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tabela_picos.yview)
         self.tabela_picos.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.protocol("WM_DELETE_WINDOW", self.fechar)
+        self.bind('<Map>', self._janela_visivel)
+
+    def _janela_visivel(self, event):
+        # <Map> do Tk raiz também chega para os filhos; só o primeiro da raiz interessa
+        if event.widget is not self:
+            return
+        self.unbind('<Map>')
+        processamento.instrumentacao.somar('inicializacao_janela', time.perf_counter() - INICIO_APP)
+        self.agendador.agendar('matplotlib', lambda tarefa: importar_matplotlib(),
+                               ao_concluir=self._montar_grafico, descricao="Carregando Matplotlib")
+        self.agendador.agendar('preaquecimento', lambda tarefa: processamento.preaquecer(MODULOS_PREAQUECIMENTO),
+                               descricao="Carregando bibliotecas")
+
+    def _montar_grafico(self, classes):
+        Figure, FigureCanvasTkAgg = classes
+        self.lbl_carregando.destroy()
+        self.figura = Figure(figsize=(8, 6))
+        self.ax_plot = self.figura.add_subplot(111)
+        self.canvas = criar_canvas(self.figura, self.plot_frame, FigureCanvasTkAgg)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        # Eixos configurados uma vez só; as curvas são criadas sob demanda e
+        # depois apenas mostradas/escondidas (ver atualizar_visualizacao)
+        self.ax_plot.set_xlabel("Número de onda (cm⁻¹)")
+        self.ax_plot.set_ylabel("Absorbância")
+        self.ax_plot.invert_xaxis()
+        self.ax_plot.grid(True, which='both', linestyle='--', linewidth=0.5)
+        self.figura.tight_layout()
+        processamento.instrumentacao.somar('inicializacao_grafico', time.perf_counter() - INICIO_APP)
+        if self.lista_datasets.curselection():
+            self.agendar_atualizacao()  # Seleção feita antes do gráfico existir
+
+    def fechar(self):
+        self.agendador.encerrar()
+        self.destroy()
+
+    def _atualizar_status(self):
+        ativas = self.agendador.descricoes()
+        self.status.set(" | ".join(ativas) + "..." if ativas else self.mensagem_status)
+
+    def informar(self, mensagem):
+        # Mensagem mostrada na barra de status quando não há tarefas ativas
+        self.mensagem_status = mensagem
+        self._atualizar_status()
+
+    def _sincronizar_controles(self):
+        for chave, controle in self.controles_parametros.items():
+            controle.set(self.parametros_processamento[chave])
+
+    def _parametro_alterado(self, chave, valor):
+        # Os controles entregam texto; converte para o tipo do padrão
+        if chave != 'baseline_metodo':
+            valor = type(processamento.PARAMETROS_PADRAO[chave])(float(valor))
+        if chave == 'window_size' and valor % 2 == 0:
+            valor += 1  # O Savitzky-Golay usa janela ímpar
+        if self.parametros_processamento.get(chave) == valor:
+            return  # Ex.: eco do set() em _sincronizar_controles
+        self.parametros_processamento[chave] = valor
+        # Arrastar um controle gera vários eventos: só o último reprocessa
+        if self.atualizacao_pendente is not None:
+            self.after_cancel(self.atualizacao_pendente)
+        self.atualizacao_pendente = self.after(ATRASO_PARAMETROS_MS, self._aplicar_parametros)
+
+    def _aplicar_parametros(self):
+        self.atualizacao_pendente = None
+        self.agendar_atualizacao()
 
     def agendar_atualizacao(self, event=None):
-        # Pequeno atraso para garantir que a seleção da lista seja processada antes de desenhar
-        self.after(50, self.atualizar_visualizacao)
+        # O processamento das amostras selecionadas roda no agendador; uma
+        # nova seleção substitui a anterior, que para na próxima amostra
+        nomes_selecionados = [self.lista_datasets.get(i) for i in self.lista_datasets.curselection()]
+        espectros = [(nome, self.datasets_carregados[nome]) for nome in nomes_selecionados]
+        parametros = dict(self.parametros_processamento)
+        self.agendador.agendar('visualizacao', lambda tarefa: self._processar_selecao(tarefa, espectros, parametros),
+                               ao_concluir=self.atualizar_visualizacao,
+                               descricao=f"Processando {len(espectros)} amostra(s)")
+
+    @staticmethod
+    def _processar_selecao(tarefa, espectros, parametros):
+        # Só aquece o cache de processamento (e lê do projeto as amostras ainda
+        # não carregadas); o desenho fica para a thread do Tk, que recebe as
+        # amostras processadas e os parâmetros usados (os controles podem ter
+        # mudado nesse meio-tempo)
+        processados = []
+        for nome, espectro in espectros:
+            if tarefa.cancelada():
+                break
+            processamento.processar_com_cache(espectro, **parametros)
+            processados.append((nome, espectro))
+        return processados, parametros
 
 # Carregar arquivos e processar dados inicialmente
 
     def carregar_arquivos(self):
+        if self.agendador.ocupado('carregamento'): return
         caminhos = filedialog.askopenfilenames(filetypes=[("Dados", "*.txt *.csv")])
         if not caminhos: return
-        
-        arquivos_carregados = 0
-        for caminho in caminhos:
-            nome_ds, df = processamento.processar_arquivo_unico(caminho)
-            if df is not None:
-                if nome_ds not in self.datasets_carregados:
-                    self.datasets_carregados[nome_ds] = df
-                    self.lista_datasets.insert(tk.END, nome_ds)
-                    self.dataset_cores[nome_ds] = next(self.cores_ciclo)  # Associa cor permanente
-                    arquivos_carregados += 1
-        
-        if arquivos_carregados > 0:
-            messagebox.showinfo("Sucesso", f"{arquivos_carregados} novo(s) arquivo(s) carregado(s)!")
+
+        # A leitura roda no agendador (com pool interno); cada arquivo lido
+        # chega como resultado parcial, sem travar o loop do Tk
+        self.arquivos_carregados = 0
+        self.barra_progresso.configure(maximum=len(caminhos), value=0)
+        self.btn_cancelar.configure(state=tk.NORMAL)
+        self.agendador.agendar('carregamento', lambda tarefa: self._carregar_em_segundo_plano(tarefa, caminhos),
+                               ao_parcial=self._receber_arquivo, ao_concluir=self._finalizar_carregamento,
+                               ao_falhar=self._erro_carregamento, descricao=f"Carregando {len(caminhos)} arquivo(s)")
+
+    @staticmethod
+    def _carregar_em_segundo_plano(tarefa, caminhos):
+        for resultado in processamento.carregar_em_lote(caminhos, cancelar=tarefa.cancelar, usar_cache=True):
+            tarefa.parcial(resultado)
+        return tarefa.cancelada()
+
+    def _receber_arquivo(self, resultado):
+        _, nome_ds, espectro = resultado
+        self.barra_progresso.step(1)
+        if espectro is not None and nome_ds not in self.datasets_carregados:
+            espectro.cor = next(self.cores_ciclo)  # Associa cor permanente
+            self.datasets_carregados[nome_ds] = espectro
+            self.lista_datasets.insert(tk.END, nome_ds)
+            self.arquivos_carregados += 1
+
+    def _erro_carregamento(self, erro):
+        self.btn_cancelar.configure(state=tk.DISABLED)
+        messagebox.showerror("Erro", f"Falha na importação: {erro}")
+
+    def _finalizar_carregamento(self, cancelado):
+        self.btn_cancelar.configure(state=tk.DISABLED)
+        self.informar(f"{len(self.datasets_carregados)} amostra(s) carregada(s)")
+
+        if self.arquivos_carregados > 0:
+            sufixo = " (importação cancelada)" if cancelado else ""
+            messagebox.showinfo("Sucesso", f"{self.arquivos_carregados} novo(s) arquivo(s) carregado(s)!{sufixo}")
+        elif cancelado:
+            messagebox.showwarning("Aviso", "Importação cancelada.")
         else:
             messagebox.showwarning("Aviso", "Nenhum arquivo novo e válido foi carregado.")
 
-# Gráfico de atualização com base nas seleções e opções
+# Projeto: amostras, cores, parâmetros e resultados numa sessão salva
 
-    def atualizar_visualizacao(self):
-        indices_selecionados = self.lista_datasets.curselection()
-        nomes_selecionados = [self.lista_datasets.get(i) for i in indices_selecionados]
-        
-        self.ax_plot.clear()
-        self.tabela_picos.delete(*self.tabela_picos.get_children())
-        
-        if not nomes_selecionados:
-            self.canvas.draw()
+    def salvar_projeto(self):
+        if not self.datasets_carregados:
+            messagebox.showwarning("Aviso", "Carregue arquivos primeiro.")
             return
+        ext = processamento.EXTENSAO_PROJETO
+        filename = filedialog.asksaveasfilename(defaultextension=ext, filetypes=[("Projeto FTIR", f"*{ext}")])
+        if not filename: return
 
-        for nome in nomes_selecionados:
-            df = self.datasets_carregados[nome]
-            cor = self.dataset_cores.get(nome, 'black')  # Pega a cor associada
-            
-            y_processado = processamento.apply_savgol_filter(
-                processamento.baseline_correction(df['absorbancia'].values)
-            )
-            picos, _ = processamento.detect_peaks_and_valleys(y_processado)
-
-            if self.show_original.get():
-                self.ax_plot.plot(df['wavenumber'], df['absorbancia'], label=f'Original: {nome}', color=cor, alpha=0.5, linestyle='--')
-            
-            if self.show_processado.get():
-                self.ax_plot.plot(df['wavenumber'], y_processado, label=f'Processado: {nome}', color=cor)
-            
-            if self.show_picos.get():
-                # MELHORIA: Picos em vermelho para melhor destaque
-                self.ax_plot.plot(df['wavenumber'].iloc[picos], y_processado[picos], 'x', color='red', markersize=5)
-            
-            for i in picos:
-                self.tabela_picos.insert('', tk.END, values=(nome, f"{df['wavenumber'].iloc[i]:.2f}", f"{y_processado[i]:.4f}"))
+        datasets = dict(self.datasets_carregados)
+        parametros = dict(self.parametros_processamento)
+        interface = {
+            'plotly': dict(self.parametros_plotly),
+            'selecionados': [self.lista_datasets.get(i) for i in self.lista_datasets.curselection()],
+            'mostrar': {'original': self.show_original.get(), 'processado': self.show_processado.get(),
+                        'picos': self.show_picos.get()},
+        }
+        self.agendador.agendar('projeto', lambda tarefa: processamento.salvar_projeto(filename, datasets, parametros, interface),
+                               ao_concluir=lambda _: self.informar(f"Projeto salvo em {filename}"),
+                               descricao=f"Salvando {os.path.basename(filename)}")
 
-        self.ax_plot.set_xlabel("Número de onda (cm⁻¹)")
-        self.ax_plot.set_ylabel("Absorbância")
-        self.ax_plot.invert_xaxis()
-        self.ax_plot.legend()
-        self.ax_plot.grid(True, which='both', linestyle='--', linewidth=0.5)
-        self.figura.tight_layout()
-        self.canvas.draw()
+    def abrir_projeto(self):
+        if self.agendador.ocupado('carregamento') or self.agendador.ocupado('projeto'): return
+        ext = processamento.EXTENSAO_PROJETO
+        filename = filedialog.askopenfilename(filetypes=[("Projeto FTIR", f"*{ext}")])
+        if not filename: return
+        try:
+            # Só o manifesto é lido aqui; os espectros vêm do zip quando selecionados
+            datasets, parametros, interface = processamento.abrir_projeto(filename)
+        except (OSError, ValueError) as erro:
+            messagebox.showerror("Erro", f"Não foi possível abrir o projeto: {erro}")
+            return
+
+        self._limpar_sessao()
+        self.datasets_carregados.update(datasets)
+        self.parametros_processamento = parametros
+        self._sincronizar_controles()
+        self.parametros_plotly.update(interface.get('plotly', {}))
+        for chave, variavel in (('original', self.show_original), ('processado', self.show_processado), ('picos', self.show_picos)):
+            variavel.set(interface.get('mostrar', {}).get(chave, True))
+        self.lista_datasets.insert(tk.END, *datasets)
+
+        posicoes = {nome: i for i, nome in enumerate(datasets)}
+        for nome in interface.get('selecionados', []):
+            if nome in posicoes:
+                self.lista_datasets.selection_set(posicoes[nome])
+        self.informar(f"Projeto {os.path.basename(filename)}: {len(datasets)} amostra(s)")
+        self.agendar_atualizacao()
+
+    def _limpar_sessao(self):
+        self.agendador.cancelar('visualizacao')
+        for artistas in self.artistas.values():
+            for tipo in ('original', 'processado', 'picos'):
+                artistas[tipo].remove()
+        self.artistas.clear()
+        self.legenda_atual = None
+        self.tabela_picos.delete(*self.tabela_picos.get_children())
+        self.linhas_tabela.clear()
+        self.lista_datasets.delete(0, tk.END)
+        self.datasets_carregados.clear()
+        if self.ax_plot is not None:
+            legenda = self.ax_plot.get_legend()
+            if legenda is not None:
+                legenda.remove()
+            self.canvas.draw_idle()
+
+# Gráfico de atualização com base nas seleções e opções
+
+    def _artistas_de(self, nome, espectro, parametros):
+        # Cria (uma vez) as curvas da amostra, já decimadas para a tela, e
+        # atualiza se o resultado do processamento tiver mudado
+        y_processado, picos, _ = processamento.processar_com_cache(espectro, **parametros)
+        artistas = self.artistas.get(nome)
+        pontos_tela = self.winfo_screenwidth()
+
+        if artistas is None:
+            cor = espectro.cor or 'black'  # Pega a cor associada
+            x_o, y_o = processamento.decimar_min_max(espectro.wavenumber, espectro.absorbancia, pontos_tela)
+            original, = self.ax_plot.plot(x_o, y_o, label=f'Original: {nome}', color=cor, alpha=0.5, linestyle='--')
+            processado, = self.ax_plot.plot([], [], label=f'Processado: {nome}', color=cor)
+            # MELHORIA: Picos em vermelho para melhor destaque
+            marcadores, = self.ax_plot.plot([], [], 'x', color='red', markersize=5)
+            artistas = self.artistas[nome] = {
+                'original': original, 'processado': processado, 'picos': marcadores,
+                'resultado': None, 'picos_mostrados': None,
+                'completo': {'original': (espectro.wavenumber, espectro.absorbancia)},
+            }
+
+        # Mudando só proeminência/distância, a curva processada é o mesmo
+        # array (etapa em cache) e só os marcadores são trocados
+        if artistas['resultado'] is not y_processado:
+            x_p, y_p = processamento.decimar_min_max(espectro.wavenumber, y_processado, pontos_tela)
+            artistas['processado'].set_data(x_p, y_p)
+            artistas['completo']['processado'] = (espectro.wavenumber, y_processado)
+            artistas['resultado'] = y_processado
+        if artistas['picos_mostrados'] is not picos:
+            artistas['picos'].set_data(espectro.wavenumber[picos], y_processado[picos])
+            artistas['picos_mostrados'] = picos
+        return artistas
+
+    def _atualizar_tabela(self, espectros, parametros):
+        # Só mexe nas linhas das amostras que entraram/saíram (ou cujos picos mudaram)
+        nomes_selecionados = {nome for nome, _ in espectros}
+        for nome in list(self.linhas_tabela):
+            if nome not in nomes_selecionados:
+                self.tabela_picos.delete(*self.linhas_tabela.pop(nome)[1])
+
+        for nome, espectro in espectros:
+            y_processado, picos, _ = processamento.processar_com_cache(espectro, **parametros)
+            atual = self.linhas_tabela.get(nome)
+            if atual is not None and atual[0] is picos:
+                continue
+            if atual is not None:
+                self.tabela_picos.delete(*atual[1])
+            ids = [self.tabela_picos.insert('', tk.END, values=(nome, f"{espectro.wavenumber[i]:.2f}", f"{y_processado[i]:.4f}"))
+                   for i in picos]
+            self.linhas_tabela[nome] = (picos, ids)
+
+    def atualizar_visualizacao(self, resultado=None):
+        # Parte que mexe no Matplotlib/Tk; normalmente chamada pelo agendador
+        # (ver agendar_atualizacao) com o resultado de _processar_selecao:
+        # desenha com os parâmetros com que o processamento rodou, já em cache
+        if self.ax_plot is None:
+            return  # _montar_grafico chama de novo quando o gráfico existir
+        if resultado is None:
+            nomes = [self.lista_datasets.get(i) for i in self.lista_datasets.curselection()]
+            espectros = [(nome, self.datasets_carregados[nome]) for nome in nomes]
+            parametros = self.parametros_processamento
+        else:
+            espectros, parametros = resultado
+            # Amostras removidas/trocadas enquanto o trabalho rodava ficam de fora
+            espectros = [(nome, e) for nome, e in espectros if self.datasets_carregados.get(nome) is e]
+        selecionados = {nome for nome, _ in espectros}
+
+        # Esconde o que saiu da seleção em vez de limpar o eixo
+        for nome, artistas in self.artistas.items():
+            if nome not in selecionados:
+                for tipo in ('original', 'processado', 'picos'):
+                    artistas[tipo].set_visible(False)
+
+        visiveis = []
+        for nome, espectro in espectros:
+            artistas = self._artistas_de(nome, espectro, parametros)
+            artistas['original'].set_visible(self.show_original.get())
+            artistas['processado'].set_visible(self.show_processado.get())
+            artistas['picos'].set_visible(self.show_picos.get())
+            visiveis += [artistas[t] for t in ('original', 'processado') if artistas[t].get_visible()]
+
+        with processamento.instrumentacao.etapa('tabela_picos'):
+            self._atualizar_tabela(espectros, parametros)
+
+        # Legenda só é refeita quando o conjunto de curvas visíveis muda
+        if visiveis != self.legenda_atual:
+            legenda = self.ax_plot.get_legend()
+            if legenda is not None:
+                legenda.remove()
+            if visiveis:
+                self.ax_plot.legend(handles=visiveis)
+            self.legenda_atual = visiveis
+
+        self.ax_plot.relim(visible_only=True)
+        self.ax_plot.autoscale_view()
+        self.canvas.draw_idle()
+
+    def _linhas_visiveis(self):
+        if self.ax_plot is None:
+            return []
+        return [linha for linha in self.ax_plot.get_lines() if linha.get_visible()]
 
     def salvar_grafico(self):
-        if not self.ax_plot.has_data():
+        if not self._linhas_visiveis():
             messagebox.showwarning("Aviso", "Nenhum gráfico disponível para salvar.")
             return
         filename = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png"), ("PDF", "*.pdf"), ("SVG", "*.svg")])
         if filename:
-            self.figura.savefig(filename, dpi=300)
+            # A tela usa curvas decimadas; o arquivo sai com a resolução total
+            decimados = []
+            for artistas in self.artistas.values():
+                for tipo, dados in artistas['completo'].items():
+                    decimados.append((artistas[tipo], artistas[tipo].get_data()))
+                    artistas[tipo].set_data(*dados)
+            try:
+                self.figura.savefig(filename, dpi=300)
+            finally:
+                for linha, dados in decimados:
+                    linha.set_data(*dados)
             messagebox.showinfo("Sucesso", f"Gráfico salvo em {filename}")
 
 # Exportar picos detectados para CSV para analisar bandas e intervalos
 
-    def exportar_picos(self):
+    def _nomes_selecionados_para(self, acao):
         indices_selecionados = self.lista_datasets.curselection()
         if not indices_selecionados:
-            messagebox.showwarning("Aviso", "Selecione as amostras para exportar os picos.")
-            return
-        nomes_selecionados = [self.lista_datasets.get(i) for i in indices_selecionados]
-        
-        todos_os_picos = []
-        for nome in nomes_selecionados:
-            df = self.datasets_carregados[nome]
-            y = processamento.apply_savgol_filter(processamento.baseline_correction(df['absorbancia'].values))
-            picos, _ = processamento.detect_peaks_and_valleys(y)
-            for i in picos:
-                todos_os_picos.append((nome, df['wavenumber'].iloc[i], y[i]))
-        
-        if not todos_os_picos:
+            messagebox.showwarning("Aviso", f"Selecione as amostras para {acao}.")
+            return None
+        return [self.lista_datasets.get(i) for i in indices_selecionados]
+
+    def exportar_picos(self):
+        nomes_selecionados = self._nomes_selecionados_para("exportar os picos")
+        if not nomes_selecionados: return
+
+        datasets = {nome: self.datasets_carregados[nome] for nome in nomes_selecionados}
+        parametros = dict(self.parametros_processamento)
+        self.agendador.agendar('exportar_picos', lambda tarefa: processamento.montar_tabela_picos(datasets, nomes_selecionados, **parametros),
+                               ao_concluir=self._salvar_tabela_picos, descricao="Montando tabela de picos")
+
+    def _salvar_tabela_picos(self, tabela):
+        if tabela.empty:
             messagebox.showinfo("Aviso", "Nenhum pico detectado nas amostras selecionadas.")
             return
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")])
+        if filename:
+            self.agendador.agendar('exportar_picos', lambda tarefa: processamento.exportar_tabela(tabela, filename),
+                                   ao_concluir=lambda _: messagebox.showinfo("Sucesso", f"Picos exportados para {filename}"),
+                                   ao_falhar=self._erro_exportacao, descricao=f"Gravando {os.path.basename(filename)}")
+
+    def _erro_exportacao(self, erro):
+        if isinstance(erro, ImportError):
+            messagebox.showerror("Erro", "Para salvar em Parquet instale o pyarrow (pip install pyarrow).")
+        else:
+            messagebox.showerror("Erro", f"Falha ao exportar: {erro}")
+
+    def comparar_bandas(self):
+        # Matriz amostra x banda de referência (ex.: 1640, 1545, 2920 ± 4 cm⁻¹)
+        nomes_selecionados = self._nomes_selecionados_para("comparar as bandas")
+        if not nomes_selecionados: return
+        texto = simpledialog.askstring("Bandas de referência", "Bandas (cm⁻¹), separadas por vírgula ou espaço:", parent=self)
+        if not texto: return
+        tolerancia = simpledialog.askfloat("Tolerância", "Tolerância (± cm⁻¹):", initialvalue=4.0, minvalue=0.0, parent=self)
+        if tolerancia is None: return
+        try:
+            bandas = [float(b) for b in texto.replace(',', ' ').split()]
+        except ValueError:
+            messagebox.showerror("Erro", "As bandas devem ser números (ex.: 1640 1545 2920).")
+            return
+
+        datasets = {nome: self.datasets_carregados[nome] for nome in nomes_selecionados}
+        parametros = dict(self.parametros_processamento)
+        self.agendador.agendar('comparar_bandas',
+                               lambda tarefa: self._montar_matriz_bandas(datasets, nomes_selecionados, parametros, bandas, tolerancia),
+                               ao_concluir=self._salvar_matriz_bandas, descricao="Comparando bandas")
+
+    @staticmethod
+    def _montar_matriz_bandas(datasets, nomes, parametros, bandas, tolerancia):
+        tabela = processamento.montar_tabela_picos(datasets, nomes, **parametros)
+        matriz = processamento.IndicePicos(tabela).matriz_bandas(bandas, tolerancia=tolerancia)
+        return matriz.reindex(nomes)  # Amostras sem nenhum pico também aparecem
+
+    def _salvar_matriz_bandas(self, matriz):
         filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
         if filename:
-            pd.DataFrame(todos_os_picos, columns=["Amostra", "Wavenumber", "Intensidade"]).to_csv(filename, index=False)
-            messagebox.showinfo("Sucesso", f"Picos exportados para {filename}")
+            self.agendador.agendar('comparar_bandas', lambda tarefa: matriz.to_csv(filename),
+                                   ao_concluir=lambda _: messagebox.showinfo("Sucesso", f"Matriz de bandas exportada para {filename}"),
+                                   ao_falhar=self._erro_exportacao, descricao=f"Gravando {os.path.basename(filename)}")
+
+# Biblioteca espectral: identificar amostras comparando com referências
+
+    def criar_biblioteca(self):
+        nomes_selecionados = self._nomes_selecionados_para("criar a biblioteca")
+        if not nomes_selecionados: return
+        pasta = filedialog.askdirectory(title="Pasta da biblioteca (nova ou existente)")
+        if not pasta: return
+
+        # Amostras de projeto ainda não lidas vêm do zip: tudo fora da thread do Tk
+        espectros = [self.datasets_carregados[nome] for nome in nomes_selecionados]
+        self.agendador.agendar('biblioteca', lambda tarefa: self._gravar_biblioteca(pasta, espectros),
+                               ao_concluir=lambda biblioteca: messagebox.showinfo(
+                                   "Sucesso", f"Biblioteca com {len(biblioteca)} referência(s) salva em {pasta}"),
+                               descricao="Gravando biblioteca")
+
+    @staticmethod
+    def _gravar_biblioteca(pasta, espectros):
+        if os.path.exists(os.path.join(pasta, 'biblioteca.json')):
+            biblioteca = processamento.BibliotecaEspectral.abrir(pasta)
+            biblioteca.adicionar(espectros)
+            return biblioteca
+        return processamento.BibliotecaEspectral.criar(pasta, espectros)
+
+    def buscar_biblioteca(self):
+        nomes_selecionados = self._nomes_selecionados_para("buscar na biblioteca")
+        if not nomes_selecionados: return
+        pasta = filedialog.askdirectory(title="Pasta da biblioteca")
+        if not pasta: return
+
+        consultas = [self.datasets_carregados[nome] for nome in nomes_selecionados]
+        self.agendador.agendar('biblioteca', lambda tarefa: self._buscar_na_biblioteca(pasta, consultas),
+                               ao_concluir=lambda resultado: self._mostrar_busca(nomes_selecionados, *resultado),
+                               descricao="Buscando na biblioteca")
+
+    @staticmethod
+    def _buscar_na_biblioteca(pasta, consultas):
+        # (biblioteca, resultados); biblioteca é None se a pasta não tiver uma válida
+        try:
+            biblioteca = processamento.BibliotecaEspectral.abrir(pasta)
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return biblioteca, biblioteca.buscar(consultas, k=5)
+
+    def _mostrar_busca(self, nomes_selecionados, biblioteca, resultados):
+        if biblioteca is None:
+            messagebox.showerror("Erro", "A pasta escolhida não contém uma biblioteca válida.")
+            return
+        janela = tk.Toplevel(self)
+        janela.title(f"Busca na biblioteca ({len(biblioteca)} referências)")
+        tabela = ttk.Treeview(janela, columns=('amostra', 'posicao', 'referencia', 'score'), show='headings', height=15)
+        for coluna, titulo in zip(('amostra', 'posicao', 'referencia', 'score'), ('Amostra', '#', 'Referência', 'Correlação')):
+            tabela.heading(coluna, text=titulo)
+        tabela.column('posicao', width=40, anchor='center')
+        tabela.column('score', width=100, anchor='center')
+        for nome, resultado in zip(nomes_selecionados, resultados):
+            for posicao, (referencia, score) in enumerate(resultado.itertuples(index=False), 1):
+                tabela.insert('', tk.END, values=(nome, posicao, referencia, f"{score:.4f}"))
+        tabela.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
     def abrir_janela_plot_avancado(self):
         if not self.datasets_carregados:
             messagebox.showwarning("Aviso", "Carregue arquivos primeiro.")
             return
-        janela_avancada = JanelaPlotly(self, self.datasets_carregados, self.dataset_cores)
+        janela_avancada = JanelaPlotly(self, self.datasets_carregados)
 
 # Janela para o Plotly Avançado(para manter o código organizado)
 
 class JanelaPlotly(tk.Toplevel):
-    def __init__(self, parent, datasets, cores):
+    def __init__(self, parent, datasets):
         super().__init__(parent)
         self.title("Configurações Avançadas de Gráfico")
         self.datasets = datasets
-        self.cores_base = cores
-        self.caminho_logo = None  # Variável para armazenar o caminho da imagem
+        self.parametros = parent.parametros_plotly  # Lembrados entre aberturas (e no projeto)
+        self.parametros_processamento = parent.parametros_processamento  # Ajustados nos controles da janela principal
+        self.caminho_logo = self.parametros['logo']  # Variável para armazenar o caminho da imagem
         
         tk.Label(self, text="Selecione os datasets para plotar:").pack(pady=5, padx=10)
         
@@ -210,7 +763,7 @@ class JanelaPlotly(tk.Toplevel):
 
         tk.Label(self, text="Título do Gráfico:").pack(anchor='w', padx=10)
         self.entry_titulo = ttk.Entry(self)
-        self.entry_titulo.insert(0, "Espectros FTIR Comparados")
+        self.entry_titulo.insert(0, self.parametros['titulo'])
         self.entry_titulo.pack(fill=tk.X, padx=10)
 
         # Área para Upload de Logo  ----
@@ -222,14 +775,23 @@ class JanelaPlotly(tk.Toplevel):
         
         self.lbl_logo_status = tk.Label(frame_logo, text="Nenhuma imagem selecionada", fg="gray")
         self.lbl_logo_status.pack(side=tk.LEFT, padx=5)
+        if self.caminho_logo:
+            self.lbl_logo_status.config(text=f"Logo: ...{self.caminho_logo[-20:]}", fg="green")
         # --------------------------------------
 
         frame_picos = ttk.LabelFrame(self, text="Parâmetros de Detecção de Picos")
         frame_picos.pack(fill=tk.X, pady=10, padx=10)
         tk.Label(frame_picos, text="Prominência:").grid(row=0, column=0, sticky='w')
-        self.entry_prom = ttk.Entry(frame_picos, width=8); self.entry_prom.insert(0,"0.02"); self.entry_prom.grid(row=0, column=1, padx=5)
+        self.entry_prom = ttk.Entry(frame_picos, width=8); self.entry_prom.insert(0, str(self.parametros_processamento['prominence'])); self.entry_prom.grid(row=0, column=1, padx=5)
         tk.Label(frame_picos, text="Distância:").grid(row=0, column=2, sticky='w')
-        self.entry_dist = ttk.Entry(frame_picos, width=8); self.entry_dist.insert(0,"10"); self.entry_dist.grid(row=0, column=3, padx=5)
+        self.entry_dist = ttk.Entry(frame_picos, width=8); self.entry_dist.insert(0, str(self.parametros_processamento['distance'])); self.entry_dist.grid(row=0, column=3, padx=5)
+
+        frame_saida = ttk.LabelFrame(self, text="Saída")
+        frame_saida.pack(fill=tk.X, pady=5, padx=10)
+        self.modo_leve = tk.BooleanVar(value=self.parametros['modo_leve'])
+        ttk.Checkbutton(frame_saida, text="Modo leve (WebGL, curvas reduzidas)", variable=self.modo_leve).grid(row=0, column=0, columnspan=2, sticky='w')
+        tk.Label(frame_saida, text="Pontos por curva:").grid(row=1, column=0, sticky='w')
+        self.entry_pontos = ttk.Entry(frame_saida, width=8); self.entry_pontos.insert(0, str(self.parametros['max_pontos'])); self.entry_pontos.grid(row=1, column=1, padx=5, sticky='w')
 
         ttk.Button(self, text="Gerar Gráfico Plotly", command=self.executar).pack(pady=10)
 # Salvar e armaznar logos -----
@@ -245,22 +807,127 @@ class JanelaPlotly(tk.Toplevel):
         selecionados = [self.listbox.get(i) for i in self.listbox.curselection()]
         if not selecionados: return
         
-        cores_plotly = {nome: self.cores_base.get(nome, '#0000FF') for nome in selecionados}
+        cores_plotly = {nome: self.datasets[nome].cor or '#0000FF' for nome in selecionados}
         
         try:
-            config = {'prominence': float(self.entry_prom.get()), 'distance': int(self.entry_dist.get())}
+            config = dict(self.parametros_processamento, prominence=float(self.entry_prom.get()), distance=int(self.entry_dist.get()))
+            max_pontos = int(self.entry_pontos.get())
         except ValueError:
-            messagebox.showerror("Erro", "Prominência e Distância devem ser números válidos.")
+            messagebox.showerror("Erro", "Prominência, Distância e Pontos devem ser números válidos.")
             return
         
-        processamento.gerar_grafico_plotly(
-            self.datasets, selecionados, config,
-            self.entry_titulo.get(), cores_plotly,
+        # Os widgets são lidos aqui; a geração do HTML roda no agendador do app
+        datasets = {nome: self.datasets[nome] for nome in selecionados}
+        titulo, logo, modo_leve = self.entry_titulo.get(), self.caminho_logo, self.modo_leve.get()
+        self.parametros.update(titulo=titulo, logo=logo, modo_leve=modo_leve, max_pontos=max_pontos)
+        app = self.master
+        app.agendador.agendar('plotly', lambda tarefa: processamento.gerar_grafico_plotly(
+            datasets, selecionados, config,
+            titulo, cores_plotly,
             zoom_wavenumber=(None,None), zoom_absorbancia=(None,None), corte_eixo=None,
-            logo_path=self.caminho_logo  # <--- Passando a logo para o backend
-        )
+            logo_path=logo,  # <--- Passando a logo para o backend
+            modo_leve=modo_leve, max_pontos=max_pontos
+        ), ao_concluir=lambda caminho: app.informar(f"Gráfico Plotly salvo em {caminho}"),
+           descricao="Gerando gráfico Plotly")
         self.destroy()
         
+# Janela de desempenho: tempos por etapa, arquivos lidos e perfilador
+
+class JanelaDesempenho(tk.Toplevel):
+    perfilador = processamento.Perfilador(memoria=True)  # Um só para o app inteiro
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Desempenho")
+        self.geometry("760x520")
+
+        frame_etapas = ttk.LabelFrame(self, text="Tempo por etapa")
+        frame_etapas.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        colunas = ('etapa', 'chamadas', 'total_s', 'media_ms', 'max_ms')
+        self.tabela_etapas = ttk.Treeview(frame_etapas, columns=colunas, show='headings', height=8)
+        for coluna, titulo in zip(colunas, ('Etapa', 'Chamadas', 'Total (s)', 'Média (ms)', 'Máx (ms)')):
+            self.tabela_etapas.heading(coluna, text=titulo)
+            self.tabela_etapas.column(coluna, width=120, anchor='center')
+        self.tabela_etapas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        frame_arquivos = ttk.LabelFrame(self, text="Arquivos lidos")
+        frame_arquivos.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        colunas = ('arquivo', 'origem', 'falhas', 'tempo_ms', 'config')
+        self.tabela_arquivos = ttk.Treeview(frame_arquivos, columns=colunas, show='headings', height=6)
+        for coluna, titulo, largura in zip(colunas, ('Arquivo', 'Origem', 'Tentativas falhas', 'Tempo (ms)', 'Config'),
+                                           (200, 100, 110, 80, 250)):
+            self.tabela_arquivos.heading(coluna, text=titulo)
+            self.tabela_arquivos.column(coluna, width=largura)
+        self.tabela_arquivos.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        frame_botoes = ttk.Frame(self)
+        frame_botoes.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(frame_botoes, text="Atualizar", command=self.preencher).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_botoes, text="Exportar JSON", command=lambda: self.exportar('.json')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_botoes, text="Exportar CSV", command=lambda: self.exportar('.csv')).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_botoes, text="Zerar", command=self.zerar).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame_botoes, text="Tempo de importação", command=self.medir_importacoes).pack(side=tk.LEFT, padx=2)
+        self.btn_perfil = ttk.Button(frame_botoes, command=self.alternar_perfil)
+        self.btn_perfil.pack(side=tk.RIGHT, padx=2)
+        self._texto_botao_perfil()
+        self.preencher()
+
+    def preencher(self):
+        self.tabela_etapas.delete(*self.tabela_etapas.get_children())
+        for e in processamento.instrumentacao.resumo_etapas():
+            self.tabela_etapas.insert('', tk.END, values=(e['etapa'], e['chamadas'], f"{e['total_s']:.3f}",
+                                                          f"{e['media_ms']:.2f}", f"{e['max_ms']:.2f}"))
+        self.tabela_arquivos.delete(*self.tabela_arquivos.get_children())
+        for r in processamento.instrumentacao.arquivos:
+            self.tabela_arquivos.insert('', tk.END, values=(r.get('arquivo'), r.get('origem') or 'falhou', r.get('tentativas_falhas', ''),
+                                                            f"{r['tempo_ms']:.1f}" if 'tempo_ms' in r else '', r.get('config') or ''))
+
+    def exportar(self, extensao):
+        filename = filedialog.asksaveasfilename(parent=self, defaultextension=extensao, filetypes=[(extensao[1:].upper(), f"*{extensao}")])
+        if not filename: return
+        if extensao == '.json':
+            processamento.instrumentacao.exportar_json(filename)
+        else:
+            processamento.instrumentacao.exportar_csv(filename)
+        messagebox.showinfo("Sucesso", f"Estatísticas exportadas para {filename}", parent=self)
+
+    def zerar(self):
+        processamento.instrumentacao.limpar()
+        self.preencher()
+
+    def _texto_botao_perfil(self):
+        texto = "Parar perfilador" if self.perfilador.ativo else "Iniciar perfilador (cProfile + memória)"
+        self.btn_perfil.configure(text=texto)
+
+    def alternar_perfil(self):
+        if not self.perfilador.ativo:
+            self.perfilador.iniciar()
+        else:
+            filename = filedialog.asksaveasfilename(parent=self, defaultextension=".prof", filetypes=[("cProfile", "*.prof")])
+            relatorio = self.perfilador.parar(filename or None)
+            self._mostrar_texto("Relatório do perfilador", relatorio)
+        self._texto_botao_perfil()
+
+    def _mostrar_texto(self, titulo, relatorio):
+        janela = tk.Toplevel(self)
+        janela.title(titulo)
+        texto = tk.Text(janela, wrap='none', width=120, height=40)
+        texto.insert('1.0', relatorio)
+        texto.pack(fill=tk.BOTH, expand=True)
+
+    def medir_importacoes(self):
+        # Mede 'import app' num processo novo (python -X importtime)
+        self.master.agendador.agendar('importacoes', lambda tarefa: processamento.relatorio_importacoes('app'),
+                                      ao_concluir=lambda relatorio: self._mostrar_texto("Tempo de importação", relatorio),
+                                      descricao="Medindo tempo de importação")
+
 if __name__ == "__main__":
-    app = AppFTIR()
-    app.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analisador de Espectros FTIR")
+    parser.add_argument('--importacoes', action='store_true',
+                        help="Mostra o tempo de importação dos módulos (como python -X importtime) e sai")
+    args = parser.parse_args()
+    if args.importacoes:
+        print(processamento.relatorio_importacoes('app'))
+    else:
+        app = AppFTIR()
+        app.mainloop()
\ No newline at end of file
@@ -0,0 +1,251 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import processamento
+
+# Benchmark das etapas críticas do processamento ---
+# Ex.: python benchmark.py --pontos 1000 100000 --arquivos 1 100 --saida bench.json
+#      python benchmark.py --comparar bench_antes.json bench_depois.json
+#      python benchmark.py --importacoes --formatos   (só o tempo de importação)
+
+# Bandas típicas de FTIR (cm-1): O-H/N-H, C-H, C=O, amida I/II, C-O, "impressão digital"
+BANDAS_FTIR = [3300, 2920, 2850, 1740, 1640, 1545, 1460, 1370, 1240, 1160, 1050, 720]
+
+# Formatos aceitos pelo leitor: (separador, decimal, linhas de cabeçalho)
+FORMATOS = {
+    'ponto_virgula': (';', ',', ["Dados sintéticos para benchmark", "cm-1;A"]),
+    'virgula':       (',', '.', ["cm-1,A"]),
+    'tab':           ('\t', '.', ["Instrumento sintetico", "Resolucao: 4 cm-1", "cm-1\tA"]),
+    'espacos':       ('   ', '.', []),
+    'sem_cabecalho': (';', ',', []),
+}
+
+# ---------------------------------------------------
+
+def gerar_espectro_sintetico(n_pontos, seed=0, inicio=4000.0, fim=400.0):
+    # Espectro de absorbância realista: bandas lorentzianas nas posições usuais,
+    # baseline polinomial inclinada e ruído branco
+    rng = np.random.default_rng(seed)
+    x = np.linspace(inicio, fim, n_pontos)
+    y = np.zeros(n_pontos)
+    for centro in BANDAS_FTIR:
+        altura = rng.uniform(0.05, 1.0)
+        largura = rng.uniform(8, 60)
+        deslocamento = rng.normal(0, 5)
+        y += altura / (1 + ((x - centro - deslocamento) / largura) ** 2)
+    t = (x - fim) / (inicio - fim)
+    y += 0.05 + 0.08 * t + 0.04 * t ** 2 + rng.normal(0, 0.003, n_pontos)
+    return x, y
+
+def escrever_arquivo_sintetico(caminho, x, y, formato):
+    sep, decimal, cabecalho = FORMATOS[formato]
+    # Casas decimais fixas, como nas exportações dos instrumentos
+    dados = pd.DataFrame({'x': x, 'y': y})
+    texto = dados.to_csv(sep='\t', header=False, index=False, float_format='%.5f')
+    if decimal == ',':
+        texto = texto.replace('.', ',')
+    texto = texto.replace('\t', sep)
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        for linha in cabecalho:
+            f.write(linha + '\r\n')
+        f.write(texto.replace('\n', '\r\n'))
+
+def gerar_pasta_sintetica(pasta, n_arquivos, n_pontos, formato, seed=0):
+    os.makedirs(pasta, exist_ok=True)
+    extensao = '.txt' if formato in ('tab', 'espacos') else '.csv'
+    caminhos = []
+    for i in range(n_arquivos):
+        x, y = gerar_espectro_sintetico(n_pontos, seed=seed + i)
+        caminho = os.path.join(pasta, f"amostra{i:05d}_{formato}{extensao}")
+        escrever_arquivo_sintetico(caminho, x, y, formato)
+        caminhos.append(caminho)
+    return caminhos
+
+# ---------------------------------------------------
+
+def _silencioso():
+    # processar_arquivo_unico imprime uma linha por arquivo
+    return contextlib.redirect_stdout(io.StringIO())
+
+def _resumo(etapa, formato, n_pontos, n_arquivos, latencias, pico_bytes):
+    latencias = np.asarray(latencias)
+    total = float(latencias.sum())
+    return {
+        'etapa': etapa,
+        'formato': formato,
+        'pontos': n_pontos,
+        'arquivos': n_arquivos,
+        'chamadas': int(len(latencias)),
+        'total_s': total,
+        'p50_ms': float(np.percentile(latencias, 50) * 1000),
+        'p90_ms': float(np.percentile(latencias, 90) * 1000),
+        'p99_ms': float(np.percentile(latencias, 99) * 1000),
+        'arquivos_por_s': len(latencias) / total if total else None,
+        'pontos_por_s': len(latencias) * n_pontos / total if total else None,
+        'pico_memoria_mb': pico_bytes / 2 ** 20,
+    }
+
+def _medir(funcao, argumentos):
+    # Uma passada cronometrada (sem tracemalloc, que distorce o tempo) e
+    # uma passada curta com tracemalloc para o pico de memória
+    latencias = []
+    with _silencioso():
+        for args in argumentos:
+            t0 = time.perf_counter()
+            funcao(*args)
+            latencias.append(time.perf_counter() - t0)
+        tracemalloc.start()
+        funcao(*argumentos[0])
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return latencias, pico
+
+def medir_cenario(pasta, formato, n_pontos, n_arquivos, parametros, max_plotly=20):
+    caminhos = gerar_pasta_sintetica(pasta, n_arquivos, n_pontos, formato)
+    resultados = []
+    p = dict(processamento.PARAMETROS_PADRAO, **parametros)
+
+    # Formato desconhecido no começo de cada cenário, como numa sessão nova
+    processamento._cache_dialetos.clear()
+    lat, pico = _medir(processamento.processar_arquivo_unico, [(c,) for c in caminhos])
+    resultados.append(_resumo('importacao', formato, n_pontos, n_arquivos, lat, pico))
+
+    with _silencioso():
+        espectros = [processamento.processar_arquivo_unico(c)[1] for c in caminhos]
+
+    ys = [(e.absorbancia, p['baseline_order']) for e in espectros]
+    lat, pico = _medir(processamento.baseline_correction, ys)
+    resultados.append(_resumo('baseline', formato, n_pontos, n_arquivos, lat, pico))
+
+    corrigidos = [processamento.baseline_correction(*a) for a in ys]
+    args = [(y, p['window_size'], p['savgol_order']) for y in corrigidos]
+    lat, pico = _medir(processamento.apply_savgol_filter, args)
+    resultados.append(_resumo('suavizacao', formato, n_pontos, n_arquivos, lat, pico))
+
+    suavizados = [processamento.apply_savgol_filter(*a) for a in args]
+    args = [(y, p['prominence'], p['distance']) for y in suavizados]
+    lat, pico = _medir(processamento.detect_peaks_and_valleys, args)
+    resultados.append(_resumo('picos', formato, n_pontos, n_arquivos, lat, pico))
+
+    # Um único HTML comparando até max_plotly espectros
+    selecionados = {f"amostra{i}": e for i, e in enumerate(espectros[:max_plotly])}
+    html = os.path.join(pasta, 'grafico_benchmark.html')
+    args = [(selecionados, list(selecionados), {'prominence': p['prominence'], 'distance': p['distance']},
+             'Benchmark', {}, (None, None), (None, None), None, None, True, 4000, html, False)]
+    lat, pico = _medir(processamento.gerar_grafico_plotly, args)
+    resultados.append(_resumo('plotly', formato, n_pontos, len(selecionados), lat, pico))
+
+    for caminho in caminhos:
+        os.remove(caminho)
+    return resultados
+
+# ---------------------------------------------------
+
+def _metadados():
+    import scipy
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+    }
+
+def imprimir_resultados(resultados):
+    print(f"{'etapa':<12}{'formato':<15}{'pontos':>9}{'arqs':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+          f"{'arq/s':>10}{'Mpts/s':>9}{'mem MB':>9}")
+    for r in resultados:
+        vazao = r['pontos_por_s'] / 1e6 if r['pontos_por_s'] else 0
+        print(f"{r['etapa']:<12}{r['formato']:<15}{r['pontos']:>9}{r['arquivos']:>6}"
+              f"{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['arquivos_por_s'] or 0:>10.1f}{vazao:>9.2f}{r['pico_memoria_mb']:>9.1f}")
+
+def medir_importacoes(modulos=('app', 'processamento'), repeticoes=3):
+    # Menor tempo de 'import <modulo>' em processos novos (ms); o mínimo
+    # tira o ruído de cache de disco da primeira execução
+    return {modulo: min(processamento.medir_importacoes(modulo)[0] for _ in range(repeticoes))
+            for modulo in modulos}
+
+def comparar(caminho_antes, caminho_depois):
+    # Razão da mediana (depois / antes) por cenário; < 1 é melhora
+    with open(caminho_antes, encoding='utf-8') as f:
+        dados_antes = json.load(f)
+    with open(caminho_depois, encoding='utf-8') as f:
+        dados_depois = json.load(f)
+    antes = {(r['etapa'], r['formato'], r['pontos'], r['arquivos']): r for r in dados_antes['resultados']}
+    depois = dados_depois['resultados']
+    print(f"{'etapa':<12}{'formato':<15}{'pontos':>9}{'arqs':>6}{'antes ms':>11}{'depois ms':>11}{'razão':>8}")
+    for r in depois:
+        chave = (r['etapa'], r['formato'], r['pontos'], r['arquivos'])
+        if chave not in antes:
+            continue
+        a = antes[chave]['p50_ms']
+        razao = r['p50_ms'] / a if a else float('nan')
+        print(f"{r['etapa']:<12}{r['formato']:<15}{r['pontos']:>9}{r['arquivos']:>6}"
+              f"{a:>11.2f}{r['p50_ms']:>11.2f}{razao:>8.2f}")
+    importacoes_antes = dados_antes.get('importacoes', {})
+    for modulo, ms in dados_depois.get('importacoes', {}).items():
+        if modulo in importacoes_antes:
+            a = importacoes_antes[modulo]
+            print(f"{'import':<12}{modulo:<30}{a:>11.2f}{ms:>11.2f}{ms / a if a else float('nan'):>8.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de importação, processamento e gráfico.")
+    parser.add_argument('--pontos', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Pontos por espectro (até 1000000)")
+    parser.add_argument('--arquivos', type=int, nargs='+', default=[1, 50],
+                        help="Quantidade de arquivos por cenário (até 5000)")
+    parser.add_argument('--formatos', nargs='*', choices=list(FORMATOS), default=list(FORMATOS))
+    parser.add_argument('--prominence', type=float, default=processamento.PARAMETROS_PADRAO['prominence'])
+    parser.add_argument('--distance', type=int, default=processamento.PARAMETROS_PADRAO['distance'])
+    parser.add_argument('--pasta', default=None, help="Pasta para os arquivos sintéticos (padrão: temporária)")
+    parser.add_argument('--saida', default=None, help="Grava os resultados em JSON")
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'),
+                        help="Compara dois JSON de resultados e sai")
+    parser.add_argument('--importacoes', action='store_true',
+                        help="Mede também o tempo de importação de app/processamento (processo novo)")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    parametros = {'prominence': args.prominence, 'distance': args.distance}
+    # Módulos adiados (pandas, SciPy...) são importados antes, fora das medições
+    processamento.preaquecer()
+    resultados = []
+    with tempfile.TemporaryDirectory() as temporaria:
+        pasta = args.pasta or temporaria
+        for formato in args.formatos:
+            for n_pontos in args.pontos:
+                for n_arquivos in args.arquivos:
+                    print(f"Cenário: {formato}, {n_pontos} pontos, {n_arquivos} arquivo(s)...")
+                    resultados += medir_cenario(pasta, formato, n_pontos, n_arquivos, parametros)
+
+    imprimir_resultados(resultados)
+    importacoes = {}
+    if args.importacoes:
+        importacoes = medir_importacoes()
+        for modulo, ms in importacoes.items():
+            print(f"import {modulo}: {ms:.1f} ms")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump({'meta': _metadados(), 'parametros': parametros, 'resultados': resultados,
+                       'importacoes': importacoes}, f, indent=2)
+        print(f"Resultados salvos em {args.saida}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
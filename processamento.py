@@ -1,13 +1,98 @@
-import pandas as pd
 import numpy as np
-import chardet
-from scipy.signal import savgol_filter, find_peaks
-import plotly.graph_objs as go
 import os
 import webbrowser
 import re
 import csv
 import base64
+import argparse
+import glob
+import sys
+import hashlib
+import json
+import threading
+import time
+import cProfile
+import io
+import pstats
+import tracemalloc
+import zipfile
+import importlib
+import subprocess
+import atexit
+import weakref
+from contextlib import contextmanager
+from collections import OrderedDict, Counter
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+# Importações adiadas ---------------------------------
+# pandas, SciPy, chardet e Plotly somam alguns segundos de importação e não
+# são necessários para abrir a janela. Cada um é importado no primeiro acesso
+# a um atributo (pd.read_csv, signal.savgol_filter...), com o tempo registrado
+# na instrumentação como 'import <módulo>'. preaquecer() importa já, por
+# exemplo numa thread depois que a janela apareceu.
+
+class _ModuloAdiado:
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+        _modulos_adiados[nome] = self
+
+    def _carregar(self):
+        if self._modulo is None:
+            # import_module já é seguro entre threads (trava por módulo)
+            with instrumentacao.etapa(f'import {self._nome}'):
+                self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __repr__(self):
+        estado = 'carregado' if self._modulo is not None else 'adiado'
+        return f"<módulo {self._nome} ({estado})>"
+
+_modulos_adiados = {}
+pd = _ModuloAdiado('pandas')
+chardet = _ModuloAdiado('chardet')
+signal = _ModuloAdiado('scipy.signal')
+sparse = _ModuloAdiado('scipy.sparse')
+linalg = _ModuloAdiado('scipy.linalg')
+ndimage = _ModuloAdiado('scipy.ndimage')
+go = _ModuloAdiado('plotly.graph_objs')
+
+def preaquecer(nomes=None):
+    # Importa agora os módulos adiados (todos, ou só os de 'nomes')
+    for nome in nomes or list(_modulos_adiados):
+        _modulos_adiados[nome]._carregar()
+
+def medir_importacoes(modulo='app', limite=20):
+    # Equivalente a "python -X importtime -c 'import <modulo>'", num processo
+    # novo (o que já foi importado neste processo não conta). Devolve
+    # (total_ms, módulos mais caros) com tempos próprio/cumulativo em ms.
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                               capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}: {resultado.stderr.strip().splitlines()[-1]}")
+    linhas = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, cumulativo, nome = linha[len('import time:'):].split('|')
+        linhas.append({'modulo': nome.strip(), 'proprio_ms': int(proprio) / 1000,
+                       'cumulativo_ms': int(cumulativo) / 1000})
+    total = next((l['cumulativo_ms'] for l in linhas if l['modulo'] == modulo), 0.0)
+    return total, sorted(linhas, key=lambda l: -l['cumulativo_ms'])[:limite]
+
+def relatorio_importacoes(modulo='app', limite=20):
+    total, linhas = medir_importacoes(modulo, limite)
+    texto = [f"Importação de '{modulo}': {total:.0f} ms (processo novo)",
+             f"{'cumulativo ms':>14}{'próprio ms':>12}  módulo"]
+    texto += [f"{l['cumulativo_ms']:>14.1f}{l['proprio_ms']:>12.1f}  {l['modulo']}" for l in linhas]
+    adiados = [f"{nome}: {'carregado' if m._modulo is not None else 'adiado'}" for nome, m in _modulos_adiados.items()]
+    texto += ["", "Módulos adiados neste processo: " + ", ".join(adiados)]
+    return "\n".join(texto)
 
 # ---------------------------------------------------
 
@@ -20,96 +105,837 @@ def extrair_nome_dataset(nome_arquivo):
     else:
         return nome_base.strip()
 
+# Instrumentação (tempos por etapa e registro por arquivo) -----------------
+# Cada etapa pesada roda dentro de instrumentacao.etapa('nome'); a leitura de
+# cada arquivo deixa um registro com a config vencedora e as tentativas que
+# falharam. Tudo pode ser exportado em CSV/JSON (ou visto no app).
+# Obs.: com usar_processos=True os números ficam nos processos filhos.
+
+class Instrumentacao:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._lock:
+            self.etapas = {}    # nome -> {'chamadas', 'total_s', 'max_s'}
+            self.arquivos = []  # um dict por arquivo lido
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.somar(nome, time.perf_counter() - inicio)
+
+    def somar(self, nome, duracao):
+        with self._lock:
+            estatistica = self.etapas.setdefault(nome, {'chamadas': 0, 'total_s': 0.0, 'max_s': 0.0})
+            estatistica['chamadas'] += 1
+            estatistica['total_s'] += duracao
+            estatistica['max_s'] = max(estatistica['max_s'], duracao)
+
+    def registrar_arquivo(self, **registro):
+        with self._lock:
+            self.arquivos.append(registro)
+
+    def resumo_etapas(self):
+        with self._lock:
+            return [{'etapa': nome, 'chamadas': e['chamadas'], 'total_s': e['total_s'],
+                     'media_ms': 1000 * e['total_s'] / e['chamadas'], 'max_ms': 1000 * e['max_s']}
+                    for nome, e in sorted(self.etapas.items(), key=lambda item: -item[1]['total_s'])]
+
+    def exportar_json(self, caminho):
+        with self._lock:
+            arquivos = list(self.arquivos)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'etapas': self.resumo_etapas(), 'arquivos': arquivos}, f, indent=2, default=str)
+
+    def exportar_csv(self, caminho):
+        # Etapas no arquivo pedido; registros por arquivo em <nome>_arquivos.csv
+        pd.DataFrame(self.resumo_etapas()).to_csv(caminho, index=False)
+        with self._lock:
+            arquivos = list(self.arquivos)
+        base, extensao = os.path.splitext(caminho)
+        caminho_arquivos = f"{base}_arquivos{extensao or '.csv'}"
+        pd.DataFrame(arquivos).to_csv(caminho_arquivos, index=False)
+        return caminho, caminho_arquivos
+
+instrumentacao = Instrumentacao()
+
+class Perfilador:
+    # cProfile (e opcionalmente tracemalloc) ligado sob demanda, para achar
+    # gargalos em dados reais: iniciar() ... parar() -> texto com o relatório
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.perfil = None
+
+    @property
+    def ativo(self):
+        return self.perfil is not None
+
+    def iniciar(self):
+        self.perfil = cProfile.Profile()
+        if self.memoria:
+            tracemalloc.start()
+        self.perfil.enable()
+
+    def parar(self, caminho_prof=None, linhas=30):
+        self.perfil.disable()
+        saida = io.StringIO()
+        pstats.Stats(self.perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+        if caminho_prof:
+            self.perfil.dump_stats(caminho_prof)
+        if self.memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            principais = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            tracemalloc.stop()
+            saida.write(f"\nMemória (tracemalloc): atual {atual / 2**20:.1f} MB, pico {pico / 2**20:.1f} MB\n")
+            for estatistica in principais:
+                saida.write(f"{estatistica}\n")
+        self.perfil = None
+        return saida.getvalue()
+
+@contextmanager
+def perfilar(caminho_prof=None, memoria=False):
+    perfilador = Perfilador(memoria=memoria)
+    perfilador.iniciar()
+    try:
+        yield perfilador
+    finally:
+        print(perfilador.parar(caminho_prof))
+
+# Estrutura de dados do espectro --------------------
+# Dois arrays NumPy contíguos, ordenados uma única vez (número de onda
+# decrescente, convenção FTIR) e sem NaN. Substitui o DataFrame por amostra:
+# menos memória, sem copy/dropna/sort a cada gráfico, e recortes de faixa
+# saem como views (sem cópia).
+
+class Espectro:
+    __slots__ = ('nome', 'wavenumber', 'absorbancia', 'cor', 'origem', '__weakref__')
+
+    def __init__(self, nome, wavenumber, absorbancia, cor=None, origem=None,
+                 dtype=np.float64, ordenado=False):
+        x = np.asarray(wavenumber, dtype=dtype)
+        y = np.asarray(absorbancia, dtype=dtype)
+        if x.shape != y.shape or x.ndim != 1:
+            raise ValueError("wavenumber e absorbancia devem ser arrays 1-D do mesmo tamanho.")
+        if not ordenado:
+            validos = ~(np.isnan(x) | np.isnan(y))
+            x, y = x[validos], y[validos]
+            ordem = np.argsort(-x, kind='stable')
+            x, y = x[ordem], y[ordem]
+        self.nome = nome
+        self.wavenumber = np.ascontiguousarray(x)
+        self.absorbancia = np.ascontiguousarray(y)
+        self.cor = cor
+        self.origem = origem
+
+    @classmethod
+    def de_dataframe(cls, nome, df, **kwargs):
+        return cls(nome, df['wavenumber'].to_numpy(), df['absorbancia'].to_numpy(), **kwargs)
+
+    def __len__(self):
+        return len(self.wavenumber)
+
+    def __repr__(self):
+        if not len(self):
+            return f"Espectro({self.nome!r}, vazio)"
+        return f"Espectro({self.nome!r}, {len(self)} pontos, {self.wavenumber[0]:g}-{self.wavenumber[-1]:g} cm-1)"
+
+    def faixa(self, inicio, fim):
+        # Recorte [inicio, fim] em cm-1 (qualquer ordem); os arrays são views
+        alto, baixo = max(inicio, fim), min(inicio, fim)
+        negado = -self.wavenumber  # crescente, para o searchsorted
+        i = np.searchsorted(negado, -alto, side='left')
+        j = np.searchsorted(negado, -baixo, side='right')
+        return Espectro(self.nome, self.wavenumber[i:j], self.absorbancia[i:j],
+                        cor=self.cor, origem=self.origem, dtype=self.wavenumber.dtype, ordenado=True)
+
+    def para_dataframe(self):
+        return pd.DataFrame({'wavenumber': self.wavenumber, 'absorbancia': self.absorbancia})
+
 # ---------------------------------------------------
 
-def processar_arquivo_unico(caminho_arquivo):
-    nome_dataset = extrair_nome_dataset(caminho_arquivo)
-    
-    # 1. Detectar Encoding (para evitar erros de caracteres estranhos)
+# LISTA DE TENTATIVAS (CONFIGURAÇÕES POSSÍVEIS)
+# Usada apenas como plano B, quando a detecção de formato não encontra nada.
+# 1ª Tentativa: O formato do seu arquivo atual (Sep: ';', Dec: ',', Pula 2 linhas)
+# 2ª Tentativa: Formato CSV Padrão (Sep: ',', Dec: '.')
+# 3ª Tentativa: Formato TXT/Tabulação (Sep: '\t', Dec: '.')
+# 4ª Tentativa: Genérico (Sep: ' ', Dec: '.')
+# Se não funcionar, verificar arquivo e add separador / espaçamento específico  dele
+
+CONFIGURACOES_LEITURA = [
+    {'sep': ';',  'decimal': ',', 'skiprows': 2}, # Seu caso específico (Prioridade)
+    {'sep': ',',  'decimal': '.', 'skiprows': 0}, # Padrão Excel/EUA
+    {'sep': '\t', 'decimal': '.', 'skiprows': 0}, # Arquivos .txt de instrumentos
+    {'sep': None, 'decimal': '.', 'skiprows': 0}, # Tentativa automática do Pandas
+    {'sep': ';',  'decimal': ',', 'skiprows': 0}, # Seu caso, mas sem cabeçalho
+]
+
+# Combinações (separador, decimal) testadas pelo detector, em ordem de preferência.
+# r'\s+' cobre arquivos separados por espaços (e é aceito pela engine C do pandas).
+DIALETOS_CANDIDATOS = [
+    (';',    ','),
+    (';',    '.'),
+    (',',    '.'),
+    ('\t',   '.'),
+    ('\t',   ','),
+    (r'\s+', '.'),
+    (r'\s+', ','),
+]
+
+BYTES_AMOSTRA = 10000   # Quanto do início do arquivo é lido para detectar encoding e formato
+MINIMO_LINHAS_VALIDAS = 10
+
+# Cache de formatos já detectados: assinatura do instrumento -> config de leitura
+_cache_dialetos = {}
+
+# ---------------------------------------------------
+
+def _detectar_encoding(raw):
     try:
-        raw = open(caminho_arquivo, 'rb').read(10000)
-        encoding = chardet.detect(raw)['encoding'] or 'latin-1'
-    except:
-        encoding = 'latin-1'
-
-    # LISTA DE TENTATIVAS (CONFIGURAÇÕES POSSÍVEIS)
-    # 1ª Tentativa: O formato do seu arquivo atual (Sep: ';', Dec: ',', Pula 2 linhas)
-    # 2ª Tentativa: Formato CSV Padrão (Sep: ',', Dec: '.')
-    # 3ª Tentativa: Formato TXT/Tabulação (Sep: '\t', Dec: '.')
-    # 4ª Tentativa: Genérico (Sep: ' ', Dec: '.')
-    # Se não funcionar, verificar arquivo e add separador / espaçamento específico  dele
-
-    configuracoes = [
-        {'sep': ';',  'decimal': ',', 'skiprows': 2}, # Seu caso específico (Prioridade)
-        {'sep': ',',  'decimal': '.', 'skiprows': 0}, # Padrão Excel/EUA
-        {'sep': '\t', 'decimal': '.', 'skiprows': 0}, # Arquivos .txt de instrumentos
-        {'sep': None, 'decimal': '.', 'skiprows': 0}, # Tentativa automática do Pandas
-        {'sep': ';',  'decimal': ',', 'skiprows': 0}, # Seu caso, mas sem cabeçalho
-    ]
-
-    df_final = None
-
-    # LOOP DE TENTATIVAS
-    for config in configuracoes:
-        try:
-            # Tenta ler com a configuração atual
-            df_temp = pd.read_csv(
-                caminho_arquivo,
-                sep=config['sep'],
-                decimal=config['decimal'],
-                skiprows=config['skiprows'],
-                header=None,
-                engine='python', # Engine python é mais flexível
-                encoding=encoding,
-                on_bad_lines='skip' # Pula linhas quebradas sem travar
-            )
+        with instrumentacao.etapa('chardet'):
+            return chardet.detect(raw)['encoding'] or 'latin-1'
+    except Exception:
+        return 'latin-1'
 
-            # --- VALIDAÇÃO: Isso é dados ou lixo? ---
-            
-            # Se tiver menos de 2 colunas, essa configuração falhou
-            if df_temp.shape[1] < 2:
-                continue
-            
-            # Pega as 2 primeiras colunas
-            df_teste = df_temp.iloc[:, :2].copy()
-            
-            # Tenta converter para número
-            col0 = pd.to_numeric(df_teste.iloc[:, 0], errors='coerce')
-            col1 = pd.to_numeric(df_teste.iloc[:, 1], errors='coerce')
-            
-            # Conta quantos números válidos conseguimos
-            validos = col0.notna() & col1.notna()
-            contagem_validos = validos.sum()
-
-            # REGRA DE SUCESSO:
-            # Se conseguimos ler mais de 10 linhas de números puros, achamos a config certa!
-            if contagem_validos > 10:
-                df_final = df_teste
-                df_final.columns = ['wavenumber', 'absorbancia']
-                df_final['wavenumber'] = col0
-                df_final['absorbancia'] = col1
-                df_final = df_final.dropna().reset_index(drop=True)
-                # Ordena (opcional, mas bom para FTIR)
-                df_final = df_final.sort_values('wavenumber', ascending=False)
+def _campos_numericos(linha, sep, decimal):
+    campos = re.split(sep, linha.strip()) if sep == r'\s+' else linha.strip().split(sep)
+    if len(campos) < 2:
+        return False
+    try:
+        for campo in campos[:2]:
+            campo = campo.strip()
+            if decimal == ',':
+                if '.' in campo:
+                    return False
+                campo = campo.replace(',', '.')
+            float(campo)
+    except ValueError:
+        return False
+    return True
+
+def _linhas_amostra(raw, encoding):
+    texto = raw.decode(encoding, errors='replace')
+    linhas = texto.splitlines()
+    # Última linha pode ter sido cortada no meio pela leitura parcial
+    if len(raw) >= BYTES_AMOSTRA and len(linhas) > 1:
+        linhas = linhas[:-1]
+    return linhas
+
+def assinatura_instrumento(caminho_arquivo, linhas):
+    # Identifica o "jeito" que o espectrômetro escreve o arquivo: extensão,
+    # quantidade de linhas de cabeçalho e a forma da primeira linha numérica
+    # (dígitos trocados por '9'). Arquivos do mesmo equipamento batem aqui.
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    cabecalho = 0
+    for linha in linhas:
+        if re.match(r'\s*[-+]?\d', linha):
+            break
+        cabecalho += 1
+    primeira_numerica = linhas[cabecalho] if cabecalho < len(linhas) else ''
+    forma = re.sub(r'\d+', '9', primeira_numerica.strip())
+    return (extensao, cabecalho, forma)
+
+def detectar_formato(linhas):
+    # Analisa só o trecho inicial do arquivo (já em memória) e escolhe
+    # separador, decimal e linhas a pular de uma vez, sem parsear o arquivo todo.
+    melhor = None
+    melhor_contagem = 0
+    for sep, decimal in DIALETOS_CANDIDATOS:
+        skiprows = None
+        contagem = 0
+        for i, linha in enumerate(linhas):
+            if _campos_numericos(linha, sep, decimal):
+                if skiprows is None:
+                    skiprows = i
+                contagem += 1
+        if contagem > melhor_contagem:
+            melhor = {'sep': sep, 'decimal': decimal, 'skiprows': skiprows}
+            melhor_contagem = contagem
+    return melhor
+
+def _extrair_colunas(df_temp):
+    # --- VALIDAÇÃO: Isso é dados ou lixo? ---
+
+    # Se tiver menos de 2 colunas, essa configuração falhou
+    if df_temp.shape[1] < 2:
+        return None
+
+    # Tenta converter as 2 primeiras colunas para número
+    col0 = pd.to_numeric(df_temp.iloc[:, 0], errors='coerce')
+    col1 = pd.to_numeric(df_temp.iloc[:, 1], errors='coerce')
+
+    # REGRA DE SUCESSO:
+    # Se conseguimos ler mais de 10 linhas de números puros, achamos a config certa!
+    validos = col0.notna() & col1.notna()
+    if validos.sum() <= MINIMO_LINHAS_VALIDAS:
+        return None
+
+    # A ordenação fica por conta do Espectro
+    return col0[validos].to_numpy(dtype=np.float64), col1[validos].to_numpy(dtype=np.float64)
+
+def _ler_com_formato(caminho_arquivo, config, encoding):
+    # Leitura única com a engine C, só com as duas colunas que interessam
+    with instrumentacao.etapa('parse_csv'):
+        df_temp = pd.read_csv(
+            caminho_arquivo,
+            sep=config['sep'],
+            decimal=config['decimal'],
+            skiprows=config['skiprows'],
+            header=None,
+            usecols=[0, 1],
+            engine='c',
+            encoding=encoding,
+            on_bad_lines='skip'
+        )
+        return _extrair_colunas(df_temp)
+
+def _tentar_formato(caminho_arquivo, config):
+    if config is None:
+        return None
+    try:
+        return _ler_com_formato(caminho_arquivo, config, config['encoding'])
+    except Exception:
+        return None
+
+def _ler_com_tentativas(caminho_arquivo, encoding, nome_dataset):
+    # LOOP DE TENTATIVAS (plano B, formato não reconhecido pelo detector)
+    # Devolve (colunas, config vencedora, quantas falharam)
+    for falhas, config in enumerate(CONFIGURACOES_LEITURA):
+        try:
+            with instrumentacao.etapa('parse_tentativas'):
+                df_temp = pd.read_csv(
+                    caminho_arquivo,
+                    sep=config['sep'],
+                    decimal=config['decimal'],
+                    skiprows=config['skiprows'],
+                    header=None,
+                    engine='python', # Engine python é mais flexível
+                    encoding=encoding,
+                    on_bad_lines='skip' # Pula linhas quebradas sem travar
+                )
+            colunas = _extrair_colunas(df_temp)
+            if colunas is not None:
                 print(f"Sucesso lendo {nome_dataset} com config: {config}")
-                break # Para o loop, achamos o arquivo!
-        
+                return colunas, config, falhas
         except Exception:
             continue # Tenta a próxima configuração
+    return None, None, len(CONFIGURACOES_LEITURA)
 
-    # Se saiu do loop e df_final ainda é None, falhou tudo
-    if df_final is None or df_final.empty:
+def processar_arquivo_unico(caminho_arquivo):
+    nome_dataset = extrair_nome_dataset(caminho_arquivo)
+    inicio = time.perf_counter()
+    falhas = 0      # Tentativas de leitura que não deram certo
+    origem = None   # De onde veio a config vencedora
+
+    # 1. Lê só o começo do arquivo, uma vez, para encoding + formato
+    try:
+        with open(caminho_arquivo, 'rb') as f:
+            raw = f.read(BYTES_AMOSTRA)
+    except OSError as e:
+        print(f"FALHA FATAL: Não foi possível abrir {nome_dataset}: {e}")
+        instrumentacao.registrar_arquivo(arquivo=caminho_arquivo, sucesso=False, erro=str(e))
+        return nome_dataset, None
+
+    # 2. Formato já conhecido? (mesmo espectrômetro de um arquivo anterior)
+    assinatura = assinatura_instrumento(caminho_arquivo, _linhas_amostra(raw, 'latin-1'))
+    config = _cache_dialetos.get(assinatura)
+    colunas = _tentar_formato(caminho_arquivo, config)
+    if colunas is not None:
+        origem = 'cache_formato'
+    elif config is not None:
+        falhas += 1
+
+    # 3. Senão, detecta encoding e formato no trecho já lido
+    if colunas is None:
+        # Detectar Encoding (para evitar erros de caracteres estranhos)
+        encoding = _detectar_encoding(raw)
+        with instrumentacao.etapa('deteccao_formato'):
+            formato = detectar_formato(_linhas_amostra(raw, encoding))
+        config = dict(formato, encoding=encoding) if formato else None
+        colunas = _tentar_formato(caminho_arquivo, config)
+        if colunas is not None:
+            origem = 'detectado'
+        elif config is not None:
+            falhas += 1
+
+    if colunas is not None:
+        _cache_dialetos[assinatura] = config
+        print(f"Sucesso lendo {nome_dataset} com config: {config}")
+    else:
+        _cache_dialetos.pop(assinatura, None)
+        colunas, config, falhas_tentativas = _ler_com_tentativas(caminho_arquivo, _detectar_encoding(raw), nome_dataset)
+        falhas += falhas_tentativas
+        origem = 'tentativas' if colunas is not None else None
+
+    duracao = time.perf_counter() - inicio
+    instrumentacao.somar('importacao_arquivo', duracao)
+    instrumentacao.registrar_arquivo(
+        arquivo=caminho_arquivo, sucesso=colunas is not None, origem=origem,
+        config=config, tentativas_falhas=falhas, pontos=len(colunas[0]) if colunas else 0,
+        tempo_ms=1000 * duracao)
+
+    # Se colunas ainda é None, falhou tudo
+    if colunas is None:
         print(f"FALHA FATAL: Não foi possível ler {nome_dataset} em nenhum formato conhecido.")
         return nome_dataset, None
 
-    return nome_dataset, df_final
+    return nome_dataset, Espectro(nome_dataset, *colunas, origem=caminho_arquivo)
+
+# Leitura em blocos (arquivos com vários espectros) --
+# Exportações de medidas resolvidas no tempo / mapeamento trazem milhares de
+# espectros num arquivo só. Em vez de carregar a tabela inteira, o leitor
+# entrega blocos (nomes, wavenumber, matriz) com no máximo 'espectros_por_bloco'
+# espectros, prontos para processar_lote.
+#   orientacao='colunas': 1ª coluna = número de onda, cada coluna seguinte = um espectro
+#   orientacao='linhas':  1ª linha = número de onda, cada linha seguinte = um espectro
+
+LIMITE_LINHAS_AMOSTRA = 200
+MEMORIA_LEITURA_BLOCOS = 256 * 1024 * 1024  # Teto da matriz lida por passada (orientacao='colunas')
+LINHAS_POR_FATIA = 2048
+
+def _linhas_iniciais(caminho_arquivo):
+    # Começo do arquivo em linhas inteiras: ao menos BYTES_AMOSTRA bytes e até
+    # a primeira linha numérica, mesmo que ela sozinha passe disso (numa
+    # exportação larga uma linha traz milhares de espectros)
+    partes, total, numerica = [], 0, False
+    with open(caminho_arquivo, 'rb') as f:
+        for linha in f:
+            partes.append(linha)
+            total += len(linha)
+            numerica = numerica or re.match(rb'\s*[-+]?\d', linha) is not None
+            if (total >= BYTES_AMOSTRA and numerica) or len(partes) >= LIMITE_LINHAS_AMOSTRA:
+                break
+    return b''.join(partes)
+
+def _formato_do_arquivo(caminho_arquivo):
+    raw = _linhas_iniciais(caminho_arquivo)
+    linhas = raw.decode('latin-1').splitlines()
+    config = _cache_dialetos.get(assinatura_instrumento(caminho_arquivo, linhas))
+    if config is None:
+        encoding = _detectar_encoding(raw[:BYTES_AMOSTRA])
+        linhas = raw.decode(encoding, errors='replace').splitlines()
+        formato = detectar_formato(linhas)
+        if formato is None:
+            raise ValueError(f"Formato não reconhecido: {caminho_arquivo}")
+        config = dict(formato, encoding=encoding)
+    return config, linhas
+
+def _preencher_nan(matriz):
+    # Lacunas isoladas na absorbância são interpoladas linha a linha
+    for linha in matriz:
+        faltando = np.isnan(linha)
+        if faltando.any() and not faltando.all():
+            indices = np.arange(len(linha))
+            linha[faltando] = np.interp(indices[faltando], indices[~faltando], linha[~faltando])
+    return matriz
+
+def ler_espectros_em_blocos(caminho_arquivo, espectros_por_bloco=256, orientacao='colunas', dtype=np.float64):
+    nome_dataset = extrair_nome_dataset(caminho_arquivo)
+    config, linhas = _formato_do_arquivo(caminho_arquivo)
+    sep, decimal, skiprows = config['sep'], config['decimal'], config['skiprows']
+    opcoes = dict(sep=sep, decimal=decimal, header=None, engine='c',
+                  encoding=config['encoding'], on_bad_lines='skip')
+
+    if orientacao == 'colunas':
+        # Quantidade de colunas e nomes dos espectros (linha de cabeçalho logo
+        # acima dos dados, se houver) vêm de leituras de uma linha inteira
+        n_colunas = pd.read_csv(caminho_arquivo, skiprows=skiprows, nrows=1, **opcoes).shape[1]
+        cabecalho = []
+        if skiprows > 0:
+            cabecalho = pd.read_csv(caminho_arquivo, skiprows=skiprows - 1, nrows=1, dtype=str,
+                                    keep_default_na=False, **opcoes).iloc[0].tolist()
+        if len(cabecalho) == n_colunas:
+            nomes = [c.strip() or f"{nome_dataset} #{i}" for i, c in enumerate(cabecalho[1:], 1)]
+        else:
+            nomes = [f"{nome_dataset} #{i}" for i in range(1, n_colunas)]
+
+        # O arquivo é lido em fatias de linhas (chunksize), guardando só os
+        # números. Enquanto a matriz couber em MEMORIA_LEITURA_BLOCOS basta uma
+        # passada; acima disso cada passada leva o máximo de colunas que cabe
+        # (pontos estimados pelo tamanho do arquivo e da primeira linha de dados).
+        # A saída continua em blocos de até espectros_por_bloco espectros.
+        largura_linha = len(linhas[skiprows]) + 1 if skiprows < len(linhas) else 1
+        pontos_estimados = os.path.getsize(caminho_arquivo) // largura_linha + 1
+        por_passada = max(espectros_por_bloco,
+                          MEMORIA_LEITURA_BLOCOS // (pontos_estimados * np.dtype(dtype).itemsize))
+        wavenumber = None
+        for inicio in range(1, n_colunas, por_passada):
+            fim = min(inicio + por_passada, n_colunas)
+            xs, fatias = [], []
+            leitor = pd.read_csv(caminho_arquivo, skiprows=skiprows, usecols=[0, *range(inicio, fim)],
+                                 chunksize=LINHAS_POR_FATIA, **opcoes)
+            for fatia in leitor:
+                if (fatia.dtypes == object).any():
+                    fatia = fatia.apply(pd.to_numeric, errors='coerce')
+                xs.append(fatia.iloc[:, 0].to_numpy(dtype=np.float64))
+                fatias.append(fatia.iloc[:, 1:].to_numpy(dtype=dtype))
+            if not fatias:
+                return
+            if wavenumber is None:
+                x = np.concatenate(xs)
+                validos = ~np.isnan(x)
+                ordem = np.argsort(-x[validos], kind='stable')  # FTIR: decrescente, como no arquivo único
+                wavenumber = x[validos][ordem]
+            dados = np.concatenate(fatias)[validos][ordem].T  # (espectros, pontos)
+            del fatias
+            for i in range(0, len(dados), espectros_por_bloco):
+                matriz = _preencher_nan(np.ascontiguousarray(dados[i:i + espectros_por_bloco]))
+                primeiro = inicio - 1 + i
+                yield nomes[primeiro:primeiro + len(matriz)], wavenumber, matriz
+
+    elif orientacao == 'linhas':
+        # A linha de números de onda pode ser maior que o trecho amostrado
+        x = pd.read_csv(caminho_arquivo, skiprows=skiprows, nrows=1, **opcoes).iloc[0]
+        x = pd.to_numeric(x, errors='coerce').to_numpy(dtype=np.float64)
+        validos = ~np.isnan(x)
+        ordem = np.argsort(-x[validos], kind='stable')
+        wavenumber = x[validos][ordem]
+
+        leitor = pd.read_csv(caminho_arquivo, skiprows=skiprows + 1,
+                             chunksize=espectros_por_bloco, **opcoes)
+        contador = 0
+        for bloco in leitor:
+            bloco = bloco.iloc[:, :len(x)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=dtype)
+            matriz = _preencher_nan(np.ascontiguousarray(bloco[:, validos][:, ordem]))
+            nomes = [f"{nome_dataset} #{contador + i}" for i in range(1, len(matriz) + 1)]
+            contador += len(matriz)
+            yield nomes, wavenumber, matriz
+
+    else:
+        raise ValueError(f"orientacao deve ser 'colunas' ou 'linhas', não {orientacao!r}")
+
+def iterar_espectros(caminho_arquivo, **opcoes):
+    # Mesmo leitor, um espectro por vez: (nome, wavenumber, absorbancia)
+    for nomes, wavenumber, matriz in ler_espectros_em_blocos(caminho_arquivo, **opcoes):
+        for nome, y in zip(nomes, matriz):
+            yield nome, wavenumber, y
+
+# Cache binário de espectros -----------------------
+# Guarda wavenumber/absorbância já parseados em .npy (um arquivo por conteúdo),
+# com um indice.json que liga caminho+mtime+tamanho ao hash do conteúdo.
+# Na releitura os arrays são abertos com mmap, sem passar pelo CSV de novo.
+# O índice é atualizado só em memória a cada arquivo e gravado em disco com
+# flush(), uma vez por lote (carregar_em_lote faz isso ao terminar).
+
+PASTA_CACHE_PADRAO = os.environ.get(
+    'FTIR_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'ftir_analise'))
+TAMANHO_MAXIMO_CACHE = 512 * 1024 * 1024  # 512 MB; os menos usados saem primeiro
+
+def hash_arquivo(caminho_arquivo, tamanho_bloco=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+class CacheEspectros:
+    def __init__(self, pasta=PASTA_CACHE_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo
+        self.caminho_indice = os.path.join(pasta, 'indice.json')
+        self._lock = threading.Lock()
+        self._sujo = False
+        os.makedirs(pasta, exist_ok=True)
+        self.indice = self._ler_indice()
+
+    def _arquivo_dados(self, chave):
+        return os.path.join(self.pasta, f"{chave}.npy")
+
+    def _ler_indice(self):
+        try:
+            with open(self.caminho_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            indice = {}
+        indice.setdefault('entradas', {})   # hash -> {'bytes', 'ultimo_uso'}
+        indice.setdefault('caminhos', {})   # caminho -> {'mtime', 'tamanho', 'hash'}
+        return indice
+
+    def _salvar_indice(self):
+        # Junta com o que estiver em disco (outros processos podem ter escrito)
+        # e descarta entradas cujo .npy não existe mais
+        em_disco = self._ler_indice()
+        for secao in ('entradas', 'caminhos'):
+            em_disco[secao].update(self.indice[secao])
+        entradas = {h: e for h, e in em_disco['entradas'].items()
+                    if os.path.exists(self._arquivo_dados(h))}
+        caminhos = {c: r for c, r in em_disco['caminhos'].items() if r['hash'] in entradas}
+        self.indice = {'entradas': entradas, 'caminhos': caminhos}
+
+        temporario = f"{self.caminho_indice}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f)
+        os.replace(temporario, self.caminho_indice)
+        self._sujo = False
+
+    def flush(self):
+        # Grava o índice acumulado em memória (no-op se nada mudou)
+        with self._lock:
+            if self._sujo:
+                self._salvar_indice()
+
+    def obter(self, caminho_arquivo):
+        # Devolve (chave, espectro). espectro é None quando o arquivo ainda não está no cache;
+        # a chave deve ser repassada para guardar() depois do parse.
+        caminho = os.path.abspath(caminho_arquivo)
+        info = os.stat(caminho)
+        with self._lock:
+            ref = self.indice['caminhos'].get(caminho)
+        if ref and ref['mtime'] == info.st_mtime and ref['tamanho'] == info.st_size:
+            chave = ref['hash']
+        else:
+            chave = hash_arquivo(caminho)
+
+        try:
+            dados = np.load(self._arquivo_dados(chave), mmap_mode='r')
+        except (OSError, ValueError):
+            return chave, None
+
+        with self._lock:
+            self.indice['entradas'].setdefault(chave, {'bytes': int(dados.nbytes)})['ultimo_uso'] = time.time()
+            self.indice['caminhos'][caminho] = {'mtime': info.st_mtime, 'tamanho': info.st_size, 'hash': chave}
+            self._sujo = True
+        # Já gravado ordenado: os arrays do Espectro são as próprias linhas do mmap
+        espectro = Espectro(extrair_nome_dataset(caminho), dados[0], dados[1],
+                            origem=caminho_arquivo, ordenado=True)
+        return chave, espectro
+
+    def guardar(self, chave, caminho_arquivo, espectro):
+        caminho = os.path.abspath(caminho_arquivo)
+        info = os.stat(caminho)
+        dados = np.vstack([espectro.wavenumber, espectro.absorbancia]).astype(np.float64, copy=False)
+        destino = self._arquivo_dados(chave)
+        if not os.path.exists(destino):
+            temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'wb') as f:
+                np.save(f, dados)
+            os.replace(temporario, destino)
+
+        with self._lock:
+            self.indice['entradas'][chave] = {'bytes': int(dados.nbytes), 'ultimo_uso': time.time()}
+            self.indice['caminhos'][caminho] = {'mtime': info.st_mtime, 'tamanho': info.st_size, 'hash': chave}
+            self._despejar(manter=chave)
+            self._sujo = True
+
+    def _despejar(self, manter=None):
+        # Remove os espectros usados há mais tempo até caber no limite
+        entradas = self.indice['entradas']
+        total = sum(e['bytes'] for e in entradas.values())
+        if total <= self.tamanho_maximo:
+            return
+        for chave in sorted(entradas, key=lambda h: entradas[h].get('ultimo_uso', 0)):
+            if total <= self.tamanho_maximo:
+                break
+            if chave == manter:
+                continue
+            try:
+                os.remove(self._arquivo_dados(chave))
+            except OSError:
+                continue  # Ainda aberto (mmap) em algum lugar; tenta na próxima
+            total -= entradas.pop(chave)['bytes']
+
+    def limpar(self):
+        with self._lock:
+            for chave in list(self.indice['entradas']):
+                try:
+                    os.remove(self._arquivo_dados(chave))
+                except OSError:
+                    pass
+            self.indice = {'entradas': {}, 'caminhos': {}}
+            self._salvar_indice()
+
+_cache_padrao = None
+
+def cache_padrao():
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheEspectros()
+        atexit.register(_cache_padrao.flush)
+    return _cache_padrao
+
+def _consultar_cache(cache, caminho_arquivo):
+    # (chave, espectro); chave é None se o arquivo não pôde nem ser consultado
+    try:
+        with instrumentacao.etapa('cache_disco'):
+            chave, espectro = cache.obter(caminho_arquivo)
+    except OSError:
+        return None, None
+    if espectro is not None:
+        instrumentacao.registrar_arquivo(arquivo=caminho_arquivo, sucesso=True, origem='cache_disco',
+                                         config=None, tentativas_falhas=0, pontos=len(espectro))
+    return chave, espectro
+
+def _gravar_cache(cache, chave, caminho_arquivo, nome_dataset, espectro):
+    if chave is None or espectro is None:
+        return
+    try:
+        cache.guardar(chave, caminho_arquivo, espectro)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar {nome_dataset} no cache: {e}")
+
+def processar_arquivo_com_cache(caminho_arquivo, cache=None):
+    # Mesmo retorno de processar_arquivo_unico, mas consulta o cache antes.
+    # Só atualiza o índice em memória: quem chama faz cache.flush() no fim.
+    try:
+        cache = cache or cache_padrao()
+    except OSError:
+        return processar_arquivo_unico(caminho_arquivo)
+    chave, espectro = _consultar_cache(cache, caminho_arquivo)
+    if espectro is not None:
+        return espectro.nome, espectro
+
+    nome_dataset, espectro = processar_arquivo_unico(caminho_arquivo)
+    _gravar_cache(cache, chave, caminho_arquivo, nome_dataset, espectro)
+    return nome_dataset, espectro
+
+# Importação em lote (paralela) ---------------------
+
+def carregar_em_lote(caminhos, max_workers=None, usar_processos=False, cancelar=None, usar_cache=False):
+    # Lê vários arquivos em paralelo e devolve (caminho, nome_dataset, espectro)
+    # à medida que cada um termina (não na ordem da lista).
+    # Threads são o padrão: o parser C do pandas libera o GIL. Com
+    # usar_processos=True cada arquivo vai para um processo separado.
+    # 'cancelar' é um threading.Event opcional; quando setado, os arquivos
+    # que ainda não começaram são descartados.
+    # Com usar_cache=True os arquivos passam pelo cache binário em disco; o
+    # índice do cache é gravado uma vez, no fim do lote.
+    cache = None
+    if usar_cache:
+        try:
+            cache = cache_padrao()
+        except OSError as e:
+            print(f"Aviso: cache em disco indisponível: {e}")
+    # Em processos cada worker teria o próprio índice, então o cache é
+    # consultado e gravado aqui e só os arquivos que faltam vão para o pool
+    cache_local = cache is not None and usar_processos
+    if cache is not None and not usar_processos:
+        leitor = processar_arquivo_com_cache
+    else:
+        leitor = processar_arquivo_unico
+    Executor = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    executor = Executor(max_workers=max_workers)
+    futuros = {}
+    chaves = {}
+    try:
+        for c in caminhos:
+            if cache_local:
+                chaves[c], espectro = _consultar_cache(cache, c)
+                if espectro is not None:
+                    if cancelar is not None and cancelar.is_set():
+                        return
+                    yield c, espectro.nome, espectro
+                    continue
+            futuros[executor.submit(leitor, c)] = c
+        for futuro in as_completed(futuros):
+            if cancelar is not None and cancelar.is_set():
+                break
+            caminho = futuros[futuro]
+            try:
+                nome_dataset, espectro = futuro.result()
+            except Exception as e:
+                print(f"FALHA FATAL: Erro processando {caminho}: {e}")
+                nome_dataset, espectro = extrair_nome_dataset(caminho), None
+            if cache_local:
+                _gravar_cache(cache, chaves.get(caminho), caminho, nome_dataset, espectro)
+            yield caminho, nome_dataset, espectro
+    finally:
+        # Descarta o que ainda não começou (cancel_futures=True só existe no 3.9+)
+        for futuro in futuros:
+            futuro.cancel()
+        executor.shutdown(wait=False)
+        if cache is not None:
+            try:
+                cache.flush()
+            except OSError as e:
+                print(f"Aviso: não foi possível gravar o índice do cache: {e}")
+
+# Motor de baseline ---------------------------------
+#   'polinomial':   polinômio global sobre o índice da amostra (padrão)
+#   'als':          mínimos quadrados assimétricos (Eilers & Boelens)
+#   'arpls':        ALS com re-ponderação logística (Baek et al.)
+#   'rolling_ball': abertura morfológica (mínimo -> máximo) + suavização
+# ALS/arPLS resolvem (W + lam*D'D) z = W y, com D a 2ª diferença: o sistema
+# é pentadiagonal simétrico e sai em O(n) por iteração com solveh_banded.
+# Os pesos W mudam a cada iteração, então o que fica em cache por
+# (pontos, lam) é a penalidade lam*D'D já no formato em bandas.
+
+METODOS_BASELINE = ('polinomial', 'als', 'arpls', 'rolling_ball')
+
+@lru_cache(maxsize=16)
+def _penalidade_bandas(n_pontos, lam):
+    D = sparse.diags([1.0, -2.0, 1.0], [0, 1, 2], shape=(n_pontos - 2, n_pontos))
+    H = (lam * (D.T @ D)).tocsr()
+    bandas = np.zeros((3, n_pontos))  # formato "upper" do solveh_banded
+    bandas[0, 2:] = H.diagonal(2)
+    bandas[1, 1:] = H.diagonal(1)
+    bandas[2] = H.diagonal(0)
+    bandas.setflags(write=False)
+    return bandas
+
+def _resolver_ponderado(y, w, lam):
+    bandas = _penalidade_bandas(len(y), float(lam)).copy()
+    bandas[2] += w
+    return linalg.solveh_banded(bandas, w * y, check_finite=False)
+
+def baseline_als(y, lam=1e5, p=0.01, n_iter=10):
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones(len(y))
+    for _ in range(n_iter):
+        z = _resolver_ponderado(y, w, lam)
+        w = np.where(y > z, p, 1.0 - p)
+    return z
+
+def baseline_arpls(y, lam=1e5, tolerancia=1e-3, n_iter=50):
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones(len(y))
+    for _ in range(n_iter):
+        z = _resolver_ponderado(y, w, lam)
+        d = y - z
+        negativos = d[d < 0]
+        if len(negativos) < 2 or negativos.std() == 0:
+            break
+        m, s = negativos.mean(), negativos.std()
+        w_novo = 1.0 / (1.0 + np.exp(np.clip(2.0 * (d - (2.0 * s - m)) / s, -500, 500)))
+        if np.linalg.norm(w - w_novo) / np.linalg.norm(w) < tolerancia:
+            break
+        w = w_novo
+    return z
+
+def baseline_rolling_ball(y, janela=101):
+    y = np.asarray(y, dtype=np.float64)
+    janela = max(3, min(int(janela), len(y)))
+    aberto = ndimage.maximum_filter1d(ndimage.minimum_filter1d(y, janela, mode='nearest'), janela, mode='nearest')
+    return ndimage.uniform_filter1d(aberto, janela, mode='nearest')
+
+def estimar_baseline(y, metodo='polinomial', poly_order=2, lam=1e5, p=0.01, janela=101):
+    if metodo == 'polinomial':
+        # Índice da amostra levado a [-1, 1]: com o índice cru a base de
+        # potências fica mal condicionada em ordens altas / muitos pontos
+        x = np.linspace(-1.0, 1.0, len(y))
+        coeffs = np.polyfit(x, y, poly_order)
+        return np.polyval(coeffs, x)
+    if metodo == 'als':
+        return baseline_als(y, lam=lam, p=p)
+    if metodo == 'arpls':
+        return baseline_arpls(y, lam=lam)
+    if metodo == 'rolling_ball':
+        return baseline_rolling_ball(y, janela=janela)
+    raise ValueError(f"Método de baseline desconhecido: {metodo!r} (use {', '.join(METODOS_BASELINE)})")
+
+def _opcoes_baseline(p):
+    # Parâmetros do pipeline (PARAMETROS_PADRAO) -> argumentos de baseline_correction
+    return {'poly_order': p['baseline_order'], 'metodo': p['baseline_metodo'],
+            'lam': p['baseline_lam'], 'p': p['baseline_p'], 'janela': p['baseline_janela']}
 
 #  Aplicação de Filtros e Suavização -----
 
-def baseline_correction(y, poly_order=2):
-    x = np.arange(len(y))
-    coeffs = np.polyfit(x, y, poly_order)
-    return y - np.polyval(coeffs, x)
+def baseline_correction(y, poly_order=2, metodo='polinomial', **opcoes):
+    with instrumentacao.etapa('baseline'):
+        return y - estimar_baseline(y, metodo=metodo, poly_order=poly_order, **opcoes)
 
 def apply_savgol_filter(y, window_size=11, poly_order=2):
     if len(y) <= window_size:
@@ -118,12 +944,675 @@ def apply_savgol_filter(y, window_size=11, poly_order=2):
         window_size += 1
     if window_size <= poly_order:
         return y
-    return savgol_filter(y, window_size, poly_order)
+    with instrumentacao.etapa('savgol'):
+        return signal.savgol_filter(y, window_size, poly_order)
+
+def candidatos_picos(y, distance=5):
+    # Picos e vales que respeitam a distância mínima, com suas proeminências.
+    # find_peaks aplica a distância antes da proeminência, então o corte por
+    # proeminência depois é só uma comparação (e não depende dos outros picos).
+    with instrumentacao.etapa('picos'):
+        peaks, _ = signal.find_peaks(y, distance=distance)
+        valleys, _ = signal.find_peaks(-y, distance=distance)
+        return peaks, signal.peak_prominences(y, peaks)[0], valleys, signal.peak_prominences(-y, valleys)[0]
+
+def filtrar_por_proeminencia(candidatos, prominence=0.01):
+    peaks, prom_peaks, valleys, prom_valleys = candidatos
+    return peaks[prom_peaks >= prominence], valleys[prom_valleys >= prominence]
 
 def detect_peaks_and_valleys(y, prominence=0.01, distance=5):
-    peaks, _ = find_peaks(y, prominence=prominence, distance=distance)
-    valleys, _ = find_peaks(-y, prominence=prominence, distance=distance)
-    return peaks, valleys
+    return filtrar_por_proeminencia(candidatos_picos(y, distance=distance), prominence)
+
+# Pipeline completo (baseline -> Savitzky-Golay -> picos) com memoização ------
+
+PARAMETROS_PADRAO = {
+    'baseline_order': 2,
+    'baseline_metodo': 'polinomial',
+    'baseline_lam': 1e5,
+    'baseline_p': 0.01,
+    'baseline_janela': 101,
+    'window_size': 11,
+    'savgol_order': 2,
+    'prominence': 0.01,
+    'distance': 5,
+}
+
+def processar_espectro(y, **parametros):
+    p = dict(PARAMETROS_PADRAO, **parametros)
+    y_processado = apply_savgol_filter(
+        baseline_correction(y, **_opcoes_baseline(p)),
+        window_size=p['window_size'], poly_order=p['savgol_order']
+    )
+    picos, vales = detect_peaks_and_valleys(y_processado, prominence=p['prominence'], distance=p['distance'])
+    return y_processado, picos, vales
+
+class CacheProcessamento:
+    # Resultados de processar_espectro por (espectro, parâmetros), com descarte
+    # LRU. O espectro entra pela identidade do objeto, não pelo nome: dados
+    # diferentes com o mesmo nome não se confundem, e as entradas de um
+    # Espectro somem quando ele é coletado. Se os arrays de um espectro forem
+    # alterados no lugar, chame invalidar(espectro).
+    # As etapas intermediárias também ficam no cache, cada uma com a chave dos
+    # parâmetros dela e das anteriores: mudar só a proeminência reaproveita
+    # baseline, suavização e candidatos (com proeminências); mudar a distância
+    # refaz só os candidatos; mudar a janela do SG reaproveita a baseline.
+    ETAPAS = (
+        ('baseline', ('baseline_metodo', 'baseline_order', 'baseline_lam', 'baseline_p', 'baseline_janela')),
+        ('suavizacao', ('window_size', 'savgol_order')),
+        ('candidatos', ('distance',)),
+    )
+
+    def __init__(self, max_itens=2048):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._sementes = {}  # chave -> função que lê um resultado já salvo (ex.: projeto)
+        self._vivos = {}     # id(espectro) -> weakref.finalize
+        self._mortos = []    # ids de espectros já coletados, limpos no próximo acesso
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(chave_dataset, parametros):
+        return (chave_dataset, tuple(sorted(dict(PARAMETROS_PADRAO, **parametros).items())))
+
+    def _descartar(self, chave_dataset):
+        for itens in (self._itens, self._sementes):
+            for chave in [c for c in itens if c[0] == chave_dataset]:
+                del itens[chave]
+
+    def _id(self, espectro):
+        # Chamado com o lock. O finalize só anota o id (pode rodar no meio de
+        # uma operação com o lock tomado); a limpeza acontece aqui, antes que
+        # o id possa ser reaproveitado por outro objeto.
+        while self._mortos:
+            morto = self._mortos.pop()
+            del self._vivos[morto]
+            self._descartar(morto)
+        chave_dataset = id(espectro)
+        if chave_dataset not in self._vivos:
+            finalizador = weakref.finalize(espectro, self._mortos.append, chave_dataset)
+            finalizador.atexit = False
+            self._vivos[chave_dataset] = finalizador
+        return chave_dataset
+
+    def obter(self, espectro, **parametros):
+        with self._lock:
+            chave = self._chave(self._id(espectro), parametros)
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+            semente = self._sementes.pop(chave, None)
+
+        resultado = None
+        if semente is not None:
+            try:
+                resultado = semente()
+            except (OSError, KeyError, ValueError):
+                pass  # Resultado salvo ilegível: recalcula
+        if resultado is None:
+            resultado = self._calcular(chave[0], espectro.absorbancia, dict(PARAMETROS_PADRAO, **parametros))
+        self._guardar(chave, resultado)
+        return resultado
+
+    def _guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def _etapa(self, chave, calcular):
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        valor = calcular()
+        self._guardar(chave, valor)
+        return valor
+
+    def _calcular(self, chave_dataset, y, p):
+        # Mesmo resultado de processar_espectro, etapa por etapa
+        chaves, valores = {}, ()
+        for etapa, nomes in self.ETAPAS:
+            valores += tuple(p[nome] for nome in nomes)
+            chaves[etapa] = (chave_dataset, (etapa,) + valores)
+        y_base = self._etapa(chaves['baseline'], lambda: baseline_correction(y, **_opcoes_baseline(p)))
+        y_processado = self._etapa(chaves['suavizacao'], lambda: apply_savgol_filter(
+            y_base, window_size=p['window_size'], poly_order=p['savgol_order']))
+        candidatos = self._etapa(chaves['candidatos'], lambda: candidatos_picos(y_processado, distance=p['distance']))
+        picos, vales = filtrar_por_proeminencia(candidatos, p['prominence'])
+        return y_processado, picos, vales
+
+    def espiar(self, espectro, **parametros):
+        # Resultado já calculado, sem processar nem mexer na ordem do LRU
+        with self._lock:
+            return self._itens.get(self._chave(self._id(espectro), parametros))
+
+    def semear(self, espectro, carregar, **parametros):
+        # Registra um resultado já calculado que só é lido (carregar()) quando
+        # pedido. Vale só a semente mais recente de cada espectro.
+        with self._lock:
+            chave_dataset = self._id(espectro)
+            for chave in [c for c in self._sementes if c[0] == chave_dataset]:
+                del self._sementes[chave]
+            self._sementes[self._chave(chave_dataset, parametros)] = carregar
+
+    def invalidar(self, espectro=None):
+        with self._lock:
+            if espectro is None:
+                self._itens.clear()
+                self._sementes.clear()
+                return
+            self._descartar(self._id(espectro))
+
+cache_processamento = CacheProcessamento()
+
+def processar_com_cache(espectro, **parametros):
+    return cache_processamento.obter(espectro, **parametros)
+
+# Processamento em lote (matriz N amostras x pontos) ------------------------
+# Todas as amostras são reamostradas numa grade de número de onda comum e
+# empilhadas; baseline e Savitzky-Golay viram operações de matriz únicas.
+
+def grade_comum(espectros, passo=None):
+    # espectros: iterável de Espectro (ou arrays de wavenumber).
+    # A grade cobre só a faixa presente em todas as amostras, em ordem
+    # decrescente (convenção FTIR), com o passo mediano das amostras.
+    inicio, fim, passos = -np.inf, np.inf, []
+    for x in espectros:
+        x = np.asarray(x.wavenumber if isinstance(x, Espectro) else x, dtype=np.float64)
+        inicio, fim = max(inicio, x.min()), min(fim, x.max())
+        passos.append(np.median(np.abs(np.diff(x))))
+    if not passos or inicio >= fim:
+        raise ValueError("As amostras não têm faixa de número de onda em comum.")
+    passo = passo or float(np.median(passos))
+    n_pontos = int(np.floor((fim - inicio) / passo)) + 1
+    return fim - passo * np.arange(n_pontos)
+
+def reamostrar(wavenumber, absorbancia, grade):
+    x = np.asarray(wavenumber, dtype=np.float64)
+    y = np.asarray(absorbancia, dtype=np.float64)
+    if x[0] > x[-1]:
+        x, y = x[::-1], y[::-1]  # np.interp precisa de x crescente
+    return np.interp(grade, x, y)
+
+def empilhar_espectros(datasets, nomes=None, grade=None, passo=None):
+    # datasets: dict nome -> Espectro (como AppFTIR.datasets_carregados).
+    # Devolve (nomes, grade, matriz) com matriz de forma (N, len(grade)).
+    nomes = list(nomes if nomes is not None else datasets.keys())
+    if grade is None:
+        grade = grade_comum((datasets[n] for n in nomes), passo=passo)
+    matriz = np.empty((len(nomes), len(grade)), dtype=np.float64)
+    for i, nome in enumerate(nomes):
+        espectro = datasets[nome]
+        matriz[i] = reamostrar(espectro.wavenumber, espectro.absorbancia, grade)
+    return nomes, grade, matriz
+
+@lru_cache(maxsize=32)
+def _vandermonde_pinv(n_pontos, poly_order):
+    # Mesma base de baseline_correction (índice da amostra em [-1, 1]),
+    # calculada uma vez por tamanho/ordem
+    x = np.linspace(-1.0, 1.0, n_pontos)
+    V = np.vander(x, poly_order + 1)
+    return V, np.linalg.pinv(V)
+
+def baseline_correction_lote(Y, poly_order=2, metodo='polinomial', **opcoes):
+    Y = np.asarray(Y, dtype=np.float64)
+    with instrumentacao.etapa('baseline_lote'):
+        if metodo == 'polinomial':
+            V, V_pinv = _vandermonde_pinv(Y.shape[1], poly_order)
+            coeficientes = Y @ V_pinv.T          # (N, ordem+1): um mínimos quadrados para todas
+            return Y - coeficientes @ V.T
+        if metodo == 'rolling_ball':
+            janela = max(3, min(int(opcoes.get('janela', 101)), Y.shape[1]))
+            aberto = ndimage.maximum_filter1d(ndimage.minimum_filter1d(Y, janela, axis=1, mode='nearest'),
+                                      janela, axis=1, mode='nearest')
+            return Y - ndimage.uniform_filter1d(aberto, janela, axis=1, mode='nearest')
+        # ALS/arPLS: uma solução por linha, mas todas na mesma grade reaproveitam
+        # a penalidade em bandas do cache
+        return np.vstack([y - estimar_baseline(y, metodo=metodo, **opcoes) for y in Y]) if len(Y) else Y
+
+def apply_savgol_filter_lote(Y, window_size=11, poly_order=2):
+    n_pontos = Y.shape[1]
+    if n_pontos <= window_size:
+        window_size = n_pontos - 1
+    if window_size % 2 == 0:
+        window_size += 1
+    if window_size <= poly_order:
+        return Y
+    with instrumentacao.etapa('savgol_lote'):
+        return signal.savgol_filter(Y, window_size, poly_order, axis=1)
+
+def processar_lote(Y, **parametros):
+    # Versão matricial de processar_espectro. find_peaks só aceita 1-D,
+    # então os picos/vales saem como listas (um array de índices por linha).
+    p = dict(PARAMETROS_PADRAO, **parametros)
+    Y_processado = apply_savgol_filter_lote(
+        baseline_correction_lote(Y, **_opcoes_baseline(p)),
+        window_size=p['window_size'], poly_order=p['savgol_order']
+    )
+    picos, vales = [], []
+    for y in Y_processado:
+        pk, vl = detect_peaks_and_valleys(y, prominence=p['prominence'], distance=p['distance'])
+        picos.append(pk)
+        vales.append(vl)
+    return Y_processado, picos, vales
+
+# Tabela de picos e alinhamento entre amostras ------
+# A tabela é montada com arrays (sem loop por pico) e o IndicePicos mantém
+# todos os picos ordenados por número de onda: consultas do tipo "quais
+# amostras têm pico a ±4 cm-1 de 1640" viram dois searchsorted.
+
+COLUNAS_PICOS = ['Amostra', 'Wavenumber', 'Intensidade']
+
+def montar_tabela_picos(datasets, nomes=None, **parametros):
+    # datasets: dict nome -> Espectro. Usa o mesmo cache da visualização.
+    nomes = list(nomes if nomes is not None else datasets.keys())
+    amostras, posicoes, intensidades = [], [], []
+    for nome in nomes:
+        espectro = datasets[nome]
+        y_processado, picos, _ = processar_com_cache(espectro, **parametros)
+        amostras.append(np.full(len(picos), nome, dtype=object))
+        posicoes.append(espectro.wavenumber[picos])
+        intensidades.append(y_processado[picos])
+    if not nomes:
+        return pd.DataFrame(columns=COLUNAS_PICOS)
+    return pd.DataFrame({
+        'Amostra': np.concatenate(amostras),
+        'Wavenumber': np.concatenate(posicoes),
+        'Intensidade': np.concatenate(intensidades),
+    })
+
+def exportar_tabela(tabela, caminho):
+    # CSV ou Parquet pela extensão (Parquet precisa de pyarrow ou fastparquet)
+    if caminho.lower().endswith('.parquet'):
+        tabela.to_parquet(caminho, index=False)
+    else:
+        tabela.to_csv(caminho, index=False)
+
+class IndicePicos:
+    def __init__(self, tabela):
+        ordem = np.argsort(tabela['Wavenumber'].to_numpy(), kind='stable')
+        self.wavenumber = tabela['Wavenumber'].to_numpy(dtype=np.float64)[ordem]
+        self.intensidade = tabela['Intensidade'].to_numpy(dtype=np.float64)[ordem]
+        # Códigos na ordem em que as amostras aparecem na tabela
+        codigos, self.amostras = pd.factorize(tabela['Amostra'].to_numpy())
+        self.codigo_amostra = codigos[ordem]
+
+    def __len__(self):
+        return len(self.wavenumber)
+
+    def _intervalo(self, centro, tolerancia):
+        inicio = np.searchsorted(self.wavenumber, centro - tolerancia, side='left')
+        fim = np.searchsorted(self.wavenumber, centro + tolerancia, side='right')
+        return inicio, fim
+
+    def consultar(self, centro, tolerancia=4.0):
+        # Todos os picos dentro de centro ± tolerancia (cm-1)
+        inicio, fim = self._intervalo(centro, tolerancia)
+        return pd.DataFrame({
+            'Amostra': self.amostras[self.codigo_amostra[inicio:fim]],
+            'Wavenumber': self.wavenumber[inicio:fim],
+            'Intensidade': self.intensidade[inicio:fim],
+        })
+
+    def amostras_com_pico(self, centro, tolerancia=4.0):
+        inicio, fim = self._intervalo(centro, tolerancia)
+        return list(self.amostras[np.unique(self.codigo_amostra[inicio:fim])])
+
+    def matriz_bandas(self, bandas, tolerancia=4.0, valor='Intensidade'):
+        # Amostra x banda de referência: para cada par, o pico mais próximo do
+        # centro dentro da tolerância (NaN se não houver). valor='Wavenumber'
+        # devolve a posição encontrada em vez da intensidade.
+        origem = self.intensidade if valor == 'Intensidade' else self.wavenumber
+        matriz = np.full((len(self.amostras), len(bandas)), np.nan)
+        for j, centro in enumerate(bandas):
+            inicio, fim = self._intervalo(centro, tolerancia)
+            if inicio == fim:
+                continue
+            distancia = np.abs(self.wavenumber[inicio:fim] - centro)
+            codigos = self.codigo_amostra[inicio:fim]
+            # Ordena por (amostra, distância) e fica com o primeiro de cada amostra
+            ordem = np.lexsort((distancia, codigos))
+            primeiros = ordem[np.r_[True, np.diff(codigos[ordem]) != 0]]
+            matriz[codigos[primeiros], j] = origem[inicio:fim][primeiros]
+        return pd.DataFrame(matriz, index=pd.Index(self.amostras, name='Amostra'),
+                            columns=[f"{b:g}" for b in bandas])
+
+# Biblioteca espectral (busca por similaridade) -----
+# As referências são reamostradas numa grade fixa, processadas (baseline +
+# Savitzky-Golay) e gravadas normalizadas em .npy (float32, abertas com mmap).
+# Uma busca é um único produto matriz x vetor contra todas as referências.
+#   metodo='correlacao': Pearson (vetores centrados e normalizados)
+#   metodo='cosseno':    cosseno dos espectros processados
+#   metodo='jaccard':    sobreposição das listas de picos (bins de largura fixa)
+# prefiltro=N faz antes uma busca grossa (espectros reduzidos a poucas
+# dimensões) e só reavalia os N melhores na resolução completa.
+
+GRADE_BIBLIOTECA = (4000.0, 400.0, 2.0)   # início, fim e passo em cm-1
+DIMENSOES_PREFILTRO = 64
+
+def _normalizar_linhas(M, centrar=False):
+    M = np.asarray(M, dtype=np.float64)
+    if centrar:
+        M = M - M.mean(axis=1, keepdims=True)
+    normas = np.linalg.norm(M, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return (M / normas).astype(np.float32)
+
+def _reduzir(M, dimensoes=DIMENSOES_PREFILTRO):
+    # Média por blocos de pontos: versão "grossa" do espectro para o pré-filtro
+    n_pontos = M.shape[1]
+    usados = (n_pontos // dimensoes) * dimensoes
+    return np.asarray(M)[:, :usados].reshape(M.shape[0], dimensoes, -1).mean(axis=2)
+
+class BibliotecaEspectral:
+    ARQUIVOS = ('correlacao', 'cosseno', 'picos', 'grosso')
+
+    def __init__(self, pasta, nomes, grade, parametros, largura_bin, matrizes):
+        self.pasta = pasta
+        self.nomes = list(nomes)
+        self.grade = np.asarray(grade, dtype=np.float64)
+        self.parametros = dict(parametros)
+        self.largura_bin = largura_bin
+        self.matrizes = matrizes    # nome -> array (N, ...) possivelmente mmap
+
+    def __len__(self):
+        return len(self.nomes)
+
+    # --- Construção -------------------------------------------------------
+
+    @staticmethod
+    def _grade_padrao():
+        inicio, fim, passo = GRADE_BIBLIOTECA
+        return inicio - passo * np.arange(int(round((inicio - fim) / passo)) + 1)
+
+    def _vetores(self, espectros):
+        # Mesmo pré-processamento para referências e consultas
+        Y = np.empty((len(espectros), len(self.grade)), dtype=np.float64)
+        for i, espectro in enumerate(espectros):
+            Y[i] = reamostrar(espectro.wavenumber, espectro.absorbancia, self.grade)
+        Y_processado, picos, _ = processar_lote(Y, **self.parametros)
+
+        n_bins = int(np.ceil((self.grade[0] - self.grade[-1]) / self.largura_bin)) + 1
+        B = np.zeros((len(espectros), n_bins), dtype=np.float32)
+        for i, indices in enumerate(picos):
+            bins = ((self.grade[0] - self.grade[indices]) / self.largura_bin).astype(np.intp)
+            B[i, bins] = 1.0
+        return {
+            'correlacao': _normalizar_linhas(Y_processado, centrar=True),
+            'cosseno': _normalizar_linhas(Y_processado),
+            'picos': B,
+            'grosso': _normalizar_linhas(_reduzir(Y_processado), centrar=True),
+        }
+
+    @classmethod
+    def criar(cls, pasta, espectros, grade=None, largura_bin=8.0, **parametros):
+        # espectros: lista (ou dict) de Espectro de referência
+        if isinstance(espectros, dict):
+            espectros = list(espectros.values())
+        biblioteca = cls(pasta, [e.nome for e in espectros],
+                         cls._grade_padrao() if grade is None else grade,
+                         dict(PARAMETROS_PADRAO, **parametros), largura_bin, {})
+        biblioteca.matrizes = biblioteca._vetores(espectros)
+        biblioteca.salvar()
+        return biblioteca
+
+    def adicionar(self, espectros):
+        if isinstance(espectros, dict):
+            espectros = list(espectros.values())
+        novos = self._vetores(espectros)
+        self.matrizes = {k: np.vstack([self.matrizes[k], novos[k]]) for k in self.ARQUIVOS}
+        self.nomes += [e.nome for e in espectros]
+        self.salvar()
+
+    # --- Disco ------------------------------------------------------------
+
+    def salvar(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        for nome in self.ARQUIVOS:
+            destino = os.path.join(self.pasta, f"{nome}.npy")
+            temporario = f"{destino}.tmp"
+            with open(temporario, 'wb') as f:
+                np.save(f, np.asarray(self.matrizes[nome], dtype=np.float32))
+            os.replace(temporario, destino)
+        with open(os.path.join(self.pasta, 'biblioteca.json'), 'w', encoding='utf-8') as f:
+            json.dump({'nomes': self.nomes, 'grade': self.grade.tolist(),
+                       'parametros': self.parametros, 'largura_bin': self.largura_bin}, f)
+
+    @classmethod
+    def abrir(cls, pasta):
+        with open(os.path.join(pasta, 'biblioteca.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        matrizes = {nome: np.load(os.path.join(pasta, f"{nome}.npy"), mmap_mode='r')
+                    for nome in cls.ARQUIVOS}
+        return cls(pasta, meta['nomes'], meta['grade'], meta['parametros'], meta['largura_bin'], matrizes)
+
+    # --- Busca ------------------------------------------------------------
+
+    def _pontuar(self, metodo, vetores, consultas, referencias):
+        # consultas/referencias: índices ou slices; devolve a matriz de scores
+        if metodo == 'jaccard':
+            B = np.asarray(self.matrizes['picos'][referencias])
+            Q = vetores['picos'][consultas]
+            intersecao = Q @ B.T
+            uniao = Q.sum(axis=-1)[..., None] + B.sum(axis=1) - intersecao
+            return np.divide(intersecao, uniao, out=np.zeros_like(intersecao), where=uniao > 0)
+        return vetores[metodo][consultas] @ np.asarray(self.matrizes[metodo][referencias]).T
+
+    def buscar(self, espectros, k=5, metodo='correlacao', prefiltro=None):
+        # espectros: um Espectro ou uma lista deles (consultas em lote viram
+        # uma única multiplicação de matrizes). Devolve um DataFrame por consulta.
+        unico = isinstance(espectros, Espectro)
+        consultas = [espectros] if unico else list(espectros)
+        if metodo not in ('correlacao', 'cosseno', 'jaccard'):
+            raise ValueError(f"metodo deve ser 'correlacao', 'cosseno' ou 'jaccard', não {metodo!r}")
+        vetores = self._vetores(consultas)
+
+        if prefiltro and prefiltro < len(self):
+            grosso = vetores['grosso'] @ np.asarray(self.matrizes['grosso']).T
+            linhas = np.argpartition(-grosso, prefiltro - 1, axis=1)[:, :prefiltro]
+            scores = np.stack([self._pontuar(metodo, vetores, i, linhas[i]) for i in range(len(consultas))])
+        else:
+            # Sem pré-filtro: todas as consultas contra todas as referências de uma vez
+            linhas = np.broadcast_to(np.arange(len(self)), (len(consultas), len(self)))
+            scores = self._pontuar(metodo, vetores, slice(None), slice(None))
+
+        resultados = []
+        for i in range(len(consultas)):
+            k_i = min(k, scores.shape[1])
+            melhores = np.argpartition(-scores[i], k_i - 1)[:k_i]
+            melhores = melhores[np.argsort(-scores[i][melhores])]
+            resultados.append(pd.DataFrame({
+                'Referencia': [self.nomes[j] for j in linhas[i][melhores]],
+                'Score': scores[i][melhores].astype(np.float64),
+            }))
+        return resultados[0] if unico else resultados
+
+# Projeto (sessão salva) ----------------------------
+# Um .ftirproj é um zip com manifesto.json (amostras, cores, parâmetros de
+# processamento e estado da interface) e um .npz por espectro, mais um por
+# resultado processado. Ao abrir, só o manifesto é lido: cada amostra vira um
+# EspectroPreguicoso, que lê os próprios arrays do zip no primeiro acesso, e
+# os resultados salvos entram no cache de processamento como sementes.
+
+EXTENSAO_PROJETO = '.ftirproj'
+VERSAO_PROJETO = 1
+
+class ArquivoProjeto:
+    # O zip é aberto sob demanda e compartilhado pelas amostras do projeto
+    # (ZipFile aceita leituras concorrentes das threads do app)
+    def __init__(self, caminho):
+        self.caminho = os.path.abspath(caminho)
+        self._zip = None
+        self._lock = threading.Lock()
+        try:
+            with zipfile.ZipFile(self.caminho) as zf:
+                self.manifesto = json.loads(zf.read('manifesto.json'))
+        except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as erro:
+            raise ValueError(f"{caminho} não é um projeto válido.") from erro
+        if self.manifesto.get('versao', 0) > VERSAO_PROJETO:
+            raise ValueError(f"{caminho} foi salvo por uma versão mais nova do programa.")
+        self.parametros = dict(PARAMETROS_PADRAO, **self.manifesto.get('parametros', {}))
+
+    def _aberto(self):
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.caminho)
+            return self._zip
+
+    def ler_bytes(self, membro):
+        return self._aberto().read(membro)
+
+    def ler_arrays(self, membro):
+        with np.load(io.BytesIO(self.ler_bytes(membro))) as npz:
+            return {chave: npz[chave] for chave in npz.files}
+
+    def fechar(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+
+class EspectroPreguicoso(Espectro):
+    # Espectro de projeto: nome/cor/origem ficam em memória, os arrays só são
+    # lidos no primeiro acesso a wavenumber/absorbancia
+    __slots__ = ('_arquivo', '_membro', '_membro_processado')
+
+    def __init__(self, nome, arquivo, membro, cor=None, origem=None, membro_processado=None):
+        self.nome = nome
+        self.cor = cor
+        self.origem = origem
+        self._arquivo = arquivo
+        self._membro = membro  # None depois da leitura
+        self._membro_processado = membro_processado
+
+    def __getattr__(self, atributo):
+        # Só é chamado para slots ainda vazios, isto é, antes da primeira leitura
+        if atributo in ('wavenumber', 'absorbancia') and self._membro is not None:
+            arrays = self._arquivo.ler_arrays(self._membro)
+            self.wavenumber, self.absorbancia = arrays['wavenumber'], arrays['absorbancia']
+            self._membro = None
+            return getattr(self, atributo)
+        raise AttributeError(atributo)
+
+    @property
+    def carregado(self):
+        return self._membro is None
+
+    def __repr__(self):
+        if not self.carregado:
+            return f"Espectro({self.nome!r}, não carregado)"
+        return super().__repr__()
+
+    def ler_processado(self):
+        if self._membro_processado is None:
+            raise KeyError(f"{self.nome}: projeto sem resultado processado")
+        arrays = self._arquivo.ler_arrays(self._membro_processado)
+        return arrays['y'], arrays['picos'], arrays['vales']
+
+def _npz_bytes(**arrays):
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+def salvar_projeto(caminho, datasets, parametros=None, interface=None, cache=None):
+    # datasets: dict nome -> Espectro (como AppFTIR.datasets_carregados);
+    # interface: dict livre (JSON) com o estado da tela. Resultados já
+    # calculados com 'parametros' são gravados junto. Amostras de projeto
+    # ainda não lidas são copiadas byte a byte, sem passar pela memória
+    # inteira, e depois passam a apontar para o arquivo novo.
+    cache = cache or cache_processamento
+    parametros = dict(PARAMETROS_PADRAO, **(parametros or {}))
+    caminho = os.path.abspath(caminho)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    entradas = []
+
+    with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_STORED) as zf:
+        for i, (nome, espectro) in enumerate(datasets.items()):
+            entrada = {'nome': nome, 'cor': espectro.cor, 'origem': espectro.origem,
+                       'arquivo': f'espectros/{i:05d}.npz', 'processado': None}
+            preguicoso = isinstance(espectro, EspectroPreguicoso)
+            if preguicoso and not espectro.carregado:
+                zf.writestr(entrada['arquivo'], espectro._arquivo.ler_bytes(espectro._membro))
+            else:
+                zf.writestr(entrada['arquivo'], _npz_bytes(wavenumber=espectro.wavenumber, absorbancia=espectro.absorbancia))
+
+            membro_processado = f'processados/{i:05d}.npz'
+            resultado = cache.espiar(espectro, **parametros)
+            if resultado is not None:
+                y_processado, picos, vales = resultado
+                zf.writestr(membro_processado, _npz_bytes(y=y_processado, picos=picos, vales=vales))
+                entrada['processado'] = membro_processado
+            elif preguicoso and espectro._membro_processado and espectro._arquivo.parametros == parametros:
+                zf.writestr(membro_processado, espectro._arquivo.ler_bytes(espectro._membro_processado))
+                entrada['processado'] = membro_processado
+            entradas.append(entrada)
+
+        manifesto = {'versao': VERSAO_PROJETO, 'parametros': parametros,
+                     'interface': interface or {}, 'espectros': entradas}
+        zf.writestr('manifesto.json', json.dumps(manifesto, ensure_ascii=False, indent=1),
+                    compress_type=zipfile.ZIP_DEFLATED)
+
+    # O projeto de origem pode ser o próprio destino: fecha antes de trocar
+    preguicosos = [(e, entrada) for e, entrada in zip(datasets.values(), entradas)
+                   if isinstance(e, EspectroPreguicoso)]
+    for espectro, _ in preguicosos:
+        if espectro._arquivo.caminho == caminho:
+            espectro._arquivo.fechar()
+    os.replace(temporario, caminho)
+
+    novo = ArquivoProjeto(caminho)
+    for espectro, entrada in preguicosos:
+        espectro._arquivo = novo
+        espectro._membro_processado = entrada['processado']
+        if not espectro.carregado:
+            espectro._membro = entrada['arquivo']
+        if entrada['processado'] and cache.espiar(espectro, **parametros) is None:
+            cache.semear(espectro, espectro.ler_processado, **parametros)
+    return novo
+
+def abrir_projeto(caminho, cache=None):
+    # Só lê o manifesto. Devolve (datasets, parametros, interface). Os
+    # resultados já salvos no projeto entram no cache como sementes.
+    cache = cache or cache_processamento
+    arquivo = ArquivoProjeto(caminho)
+    datasets = {}
+    for entrada in arquivo.manifesto.get('espectros', []):
+        espectro = EspectroPreguicoso(entrada['nome'], arquivo, entrada['arquivo'], cor=entrada.get('cor'),
+                                      origem=entrada.get('origem'), membro_processado=entrada.get('processado'))
+        datasets[espectro.nome] = espectro
+        if espectro._membro_processado:
+            cache.semear(espectro, espectro.ler_processado, **arquivo.parametros)
+    return datasets, dict(arquivo.parametros), arquivo.manifesto.get('interface', {})
+
+# Decimação para exibição ---------------------------
+
+def indices_min_max(y, n_intervalos):
+    # Índices (em ordem) de no máximo ~2 pontos por intervalo: o mínimo e o
+    # máximo de cada um. Com n_intervalos = largura em pixels o desenho fica
+    # idêntico ao da curva completa.
+    n = len(y)
+    if n_intervalos <= 0 or n <= 2 * n_intervalos:
+        return np.arange(n)
+    tamanho = n // n_intervalos
+    usados = tamanho * n_intervalos
+    blocos = np.asarray(y[:usados]).reshape(n_intervalos, tamanho)
+    base = np.arange(n_intervalos) * tamanho
+    i_min = blocos.argmin(axis=1) + base
+    i_max = blocos.argmax(axis=1) + base
+    indices = np.empty(2 * n_intervalos, dtype=np.intp)
+    indices[0::2] = np.minimum(i_min, i_max)
+    indices[1::2] = np.maximum(i_min, i_max)
+    if usados < n:
+        resto = np.asarray(y[usados:])
+        extras = np.unique([usados + resto.argmin(), usados + resto.argmax(), n - 1])
+        indices = np.concatenate([indices, extras])
+    return indices
+
+def decimar_min_max(x, y, n_intervalos):
+    # Usar só para exibição, nunca para exportar
+    indices = indices_min_max(y, n_intervalos)
+    return x[indices], y[indices]
 
 # ---------------------------------------------------
 
@@ -140,39 +1629,54 @@ def normalize_column(dataframe, column_name):
 
 # ---------------------------------------------------
 
+@lru_cache(maxsize=8)
+def _logo_base64(logo_path, mtime):
+    # mtime entra na chave só para invalidar se a imagem for trocada no disco
+    with open(logo_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
 def gerar_grafico_plotly(datasets_originais, datasets_selecionados, config_picos,
                          titulo, cores, zoom_wavenumber, zoom_absorbancia, corte_eixo,
-                         logo_path=None):
+                         logo_path=None, modo_leve=True, max_pontos=4000,
+                         caminho_saida=None, abrir_navegador=True):
+    # modo_leve: traços WebGL (Scattergl), cada curva reduzida a ~max_pontos
+    # (mínimos/máximos locais e todos os picos preservados) e o plotly.js
+    # referenciado num plotly.min.js ao lado do HTML em vez de embutido.
+    # modo_leve=False gera o HTML completo e autônomo, como antes.
+    # caminho_saida/abrir_navegador permitem gerar sem interface (scripts, benchmark).
+    inicio = time.perf_counter()
     fig = go.Figure()
+    Traco = go.Scattergl if modo_leve else go.Scatter
 
     # 1. Adiciona as linhas dos espectros
     for nome_base in datasets_selecionados:
         if nome_base not in datasets_originais:
             continue
-        df = datasets_originais[nome_base].copy().dropna()
-        df = df.sort_values('wavenumber', ascending=False)
+        espectro = datasets_originais[nome_base]  # Já limpo e ordenado
+
+        # Processamento para detecção de picos (para mostrar os marcadores 'x')
+        # Reaproveita o que a janela principal já calculou, se os parâmetros baterem
+        # config_picos: parâmetros do pipeline (ao menos prominence e distance)
+        _, peaks, valleys = processar_com_cache(espectro, **config_picos)
+
+        if modo_leve and max_pontos:
+            indices = np.union1d(indices_min_max(espectro.absorbancia, max_pontos // 2), peaks)
+            x_linha, y_linha = espectro.wavenumber[indices], espectro.absorbancia[indices]
+        else:
+            x_linha, y_linha = espectro.wavenumber, espectro.absorbancia
 
         cor_atual = cores.get(nome_base, '#0000FF')
-        fig.add_trace(go.Scatter(
-            x=df['wavenumber'],
-            y=df['absorbancia'],
+        fig.add_trace(Traco(
+            x=x_linha,
+            y=y_linha,
             mode='lines',
             line=dict(color=cor_atual, width=2),
             name=nome_base
         ))
 
-        # Processamento para detecção de picos (para mostrar os marcadores 'x')
-        y_processado = baseline_correction(df['absorbancia'].values)
-        y_processado = apply_savgol_filter(y_processado)
-
-        peaks, valleys = detect_peaks_and_valleys(
-            y_processado,
-            prominence=config_picos['prominence'],
-            distance=config_picos['distance']
-        )
-        fig.add_trace(go.Scatter(
-            x=df['wavenumber'].iloc[peaks],
-            y=df['absorbancia'].iloc[peaks],
+        fig.add_trace(Traco(
+            x=espectro.wavenumber[peaks],
+            y=espectro.absorbancia[peaks],
             mode='markers',
             marker=dict(symbol='x', size=8, color='red'),
             name=f"Picos {nome_base}",
@@ -182,9 +1686,8 @@ def gerar_grafico_plotly(datasets_originais, datasets_selecionados, config_picos
     # 2. Configuração da Logo (Estilo Assinatura)
     if logo_path and os.path.exists(logo_path):
         try:
-            with open(logo_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            
+            encoded_string = _logo_base64(logo_path, os.path.getmtime(logo_path))
+
             fig.add_layout_image(
                 dict(
                     source=f'data:image/png;base64,{encoded_string}',
@@ -230,6 +1733,285 @@ def gerar_grafico_plotly(datasets_originais, datasets_selecionados, config_picos
     fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor="#E5E5E5")
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor="#E5E5E5")
 
-    filepath = os.path.join(os.getcwd(), "grafico_interativo.html")
-    fig.write_html(filepath)
-    webbrowser.open(f'file://{filepath}')
\ No newline at end of file
+    instrumentacao.somar('plotly_figura', time.perf_counter() - inicio)
+    filepath = caminho_saida or os.path.join(os.getcwd(), "grafico_interativo.html")
+    # 'directory': grava plotly.min.js na mesma pasta (só se ainda não existir)
+    with instrumentacao.etapa('plotly_html'):
+        fig.write_html(filepath, include_plotlyjs='directory' if modo_leve else True)
+    if abrir_navegador:
+        webbrowser.open(f'file://{filepath}')
+    return filepath
+
+# Modo lote / linha de comando ----------------------
+# Ex.: python processamento.py dados/ -o resultados --workers 8 --tempos
+
+EXTENSOES_DADOS = ('.csv', '.txt')
+
+def listar_arquivos(entradas, recursivo=False):
+    # Aceita pastas, arquivos ou padrões glob; devolve caminhos únicos e ordenados
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            padrao = os.path.join(entrada, '**', '*') if recursivo else os.path.join(entrada, '*')
+            candidatos = glob.glob(padrao, recursive=recursivo)
+        else:
+            candidatos = glob.glob(entrada, recursive=recursivo) or [entrada]
+        caminhos.extend(c for c in candidatos
+                        if os.path.isfile(c) and c.lower().endswith(EXTENSOES_DADOS))
+    return sorted(set(caminhos))
+
+def identificadores_amostras(caminhos):
+    # caminho -> identificador único: o caminho relativo à pasta comum a todos,
+    # sem extensão e com '/' (ex.: 'lote_a/PA11_1'). O nome de extrair_nome_dataset
+    # não serve aqui: 'a/PA11_1.csv', 'a/PA11_2.csv' e 'b/PA11_1.csv' dariam 'PA11'.
+    if not caminhos:
+        return {}
+    absolutos = [os.path.abspath(c) for c in caminhos]
+    raiz = os.path.commonpath([os.path.dirname(c) for c in absolutos])
+    relativos = [os.path.relpath(c, raiz).replace(os.sep, '/') for c in absolutos]
+    sem_extensao = [os.path.splitext(r)[0] for r in relativos]
+    repetidos = {i for i, n in Counter(sem_extensao).items() if n > 1}
+    # Mesmo nome com extensões diferentes (x.csv e x.txt): mantém a extensão
+    return {c: r if i in repetidos else i for c, r, i in zip(caminhos, relativos, sem_extensao)}
+
+def _em_blocos(itens, tamanho):
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+def _gravar_espectro(pasta_espectros, amostra, wavenumber, y, y_processado):
+    destino = os.path.join(pasta_espectros, *f"{amostra}_processado.csv".split('/'))
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    pd.DataFrame({
+        'wavenumber': wavenumber,
+        'absorbancia': y,
+        'absorbancia_processada': y_processado,
+    }).to_csv(destino, index=False)
+
+def _anexar_picos(caminho_picos, linhas_picos, cabecalho_escrito):
+    # Anexa um bloco à tabela de picos; devolve se o cabeçalho já foi escrito
+    if not linhas_picos:
+        return cabecalho_escrito
+    pd.concat(linhas_picos, ignore_index=True).to_csv(
+        caminho_picos, mode='a' if cabecalho_escrito else 'w',
+        header=not cabecalho_escrito, index=False)
+    return True
+
+def executar_pipeline(caminhos, pasta_saida, parametros=None, max_workers=None,
+                      usar_processos=False, usar_cache=False, tamanho_lote=200, multiplos=None):
+    # importação -> baseline -> suavização -> picos, em blocos de 'tamanho_lote'
+    # arquivos: cada espectro é gravado assim que fica pronto e a tabela de
+    # picos é anexada bloco a bloco, então a memória não cresce com a pasta.
+    # Cada amostra é identificada pelo caminho relativo (identificadores_amostras):
+    # é o valor da coluna Amostra e espectros/ repete a estrutura de subpastas.
+    # multiplos='colunas'/'linhas': cada arquivo traz vários espectros nessa
+    # orientação (ver _pipeline_multiplos).
+    p = dict(PARAMETROS_PADRAO, **(parametros or {}))
+    pasta_espectros = os.path.join(pasta_saida, 'espectros')
+    os.makedirs(pasta_espectros, exist_ok=True)
+    caminho_picos = os.path.join(pasta_saida, 'picos.csv')
+    if multiplos:
+        return _pipeline_multiplos(caminhos, pasta_espectros, caminho_picos, p, multiplos, tamanho_lote)
+
+    tempos = dict.fromkeys(['importacao', 'baseline', 'suavizacao', 'picos', 'escrita'], 0.0)
+    contagem = {'arquivos': len(caminhos), 'processados': 0, 'falhas': 0, 'picos': 0}
+    cabecalho_escrito = False
+    identificadores = identificadores_amostras(caminhos)
+    amostras = []  # Processadas com sucesso, inclusive as sem nenhum pico
+
+    for bloco in _em_blocos(caminhos, tamanho_lote):
+        linhas_picos = []
+        resultados = carregar_em_lote(bloco, max_workers=max_workers,
+                                      usar_processos=usar_processos, usar_cache=usar_cache)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                caminho, _, espectro = next(resultados)
+            except StopIteration:
+                break
+            t1 = time.perf_counter()
+            tempos['importacao'] += t1 - t0
+
+            if espectro is None:
+                contagem['falhas'] += 1
+                continue
+
+            y = espectro.absorbancia
+            y_base = baseline_correction(y, **_opcoes_baseline(p))
+            t2 = time.perf_counter()
+            y_processado = apply_savgol_filter(y_base, window_size=p['window_size'], poly_order=p['savgol_order'])
+            t3 = time.perf_counter()
+            picos, _ = detect_peaks_and_valleys(y_processado, prominence=p['prominence'], distance=p['distance'])
+            t4 = time.perf_counter()
+
+            amostra = identificadores[caminho]
+            _gravar_espectro(pasta_espectros, amostra, espectro.wavenumber, y, y_processado)
+            linhas_picos.append(pd.DataFrame({
+                'Amostra': amostra,
+                'Wavenumber': espectro.wavenumber[picos],
+                'Intensidade': y_processado[picos],
+            }))
+            t5 = time.perf_counter()
+
+            tempos['baseline'] += t2 - t1
+            tempos['suavizacao'] += t3 - t2
+            tempos['picos'] += t4 - t3
+            tempos['escrita'] += t5 - t4
+            contagem['processados'] += 1
+            contagem['picos'] += len(picos)
+            amostras.append(amostra)
+
+        t0 = time.perf_counter()
+        cabecalho_escrito = _anexar_picos(caminho_picos, linhas_picos, cabecalho_escrito)
+        tempos['escrita'] += time.perf_counter() - t0
+
+    return {'tempos': tempos, 'contagem': contagem, 'picos': caminho_picos, 'amostras': amostras}
+
+def _pipeline_multiplos(caminhos, pasta_espectros, caminho_picos, p, orientacao, tamanho_lote):
+    # Mesmo pipeline para arquivos com vários espectros: cada arquivo é lido
+    # com ler_espectros_em_blocos (até 'tamanho_lote' espectros por bloco) e
+    # baseline/suavização rodam na matriz do bloco. A amostra é
+    # '<identificador do arquivo>/<nome do espectro>'.
+    tempos = dict.fromkeys(['importacao', 'baseline', 'suavizacao', 'picos', 'escrita'], 0.0)
+    contagem = {'arquivos': len(caminhos), 'processados': 0, 'falhas': 0, 'picos': 0}
+    cabecalho_escrito = False
+    identificadores = identificadores_amostras(caminhos)
+    amostras = []  # Processadas com sucesso, inclusive as sem nenhum pico
+
+    for caminho in caminhos:
+        blocos = ler_espectros_em_blocos(caminho, espectros_por_bloco=tamanho_lote, orientacao=orientacao)
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    nomes, wavenumber, Y = next(blocos)
+                except StopIteration:
+                    break
+                t1 = time.perf_counter()
+                Y_base = baseline_correction_lote(Y, **_opcoes_baseline(p))
+                t2 = time.perf_counter()
+                Y_processado = apply_savgol_filter_lote(Y_base, window_size=p['window_size'], poly_order=p['savgol_order'])
+                t3 = time.perf_counter()
+                picos = [detect_peaks_and_valleys(y, prominence=p['prominence'], distance=p['distance'])[0]
+                         for y in Y_processado]
+                t4 = time.perf_counter()
+
+                linhas_picos = []
+                for nome, y, y_processado, pk in zip(nomes, Y, Y_processado, picos):
+                    amostra = f"{identificadores[caminho]}/{nome.replace('/', '_').replace(os.sep, '_')}"
+                    _gravar_espectro(pasta_espectros, amostra, wavenumber, y, y_processado)
+                    linhas_picos.append(pd.DataFrame({
+                        'Amostra': amostra,
+                        'Wavenumber': wavenumber[pk],
+                        'Intensidade': y_processado[pk],
+                    }))
+                    contagem['picos'] += len(pk)
+                    amostras.append(amostra)
+                cabecalho_escrito = _anexar_picos(caminho_picos, linhas_picos, cabecalho_escrito)
+                t5 = time.perf_counter()
+
+                tempos['importacao'] += t1 - t0
+                tempos['baseline'] += t2 - t1
+                tempos['suavizacao'] += t3 - t2
+                tempos['picos'] += t4 - t3
+                tempos['escrita'] += t5 - t4
+        except (OSError, ValueError) as e:
+            print(f"FALHA FATAL: Erro processando {caminho}: {e}")
+            contagem['falhas'] += 1
+            continue
+        contagem['processados'] += 1
+
+    return {'tempos': tempos, 'contagem': contagem, 'picos': caminho_picos, 'amostras': amostras}
+
+def _imprimir_tempos(estatisticas):
+    contagem, tempos = estatisticas['contagem'], estatisticas['tempos']
+    n = max(contagem['processados'], 1)
+    print(f"\n{'Etapa':<12}{'Total (s)':>12}{'Média/arquivo (ms)':>22}")
+    for etapa, total in tempos.items():
+        print(f"{etapa:<12}{total:>12.3f}{1000 * total / n:>22.2f}")
+    print(f"{'TOTAL':<12}{sum(tempos.values()):>12.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Processa espectros FTIR em lote (importação, baseline, suavização e picos).")
+    parser.add_argument('entradas', nargs='+', help="Pastas, arquivos ou padrões glob (ex.: 'dados/*.csv')")
+    parser.add_argument('-o', '--saida', default='resultados', help="Pasta de saída (padrão: resultados)")
+    parser.add_argument('-r', '--recursivo', action='store_true', help="Procura arquivos em subpastas")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Número de workers da importação")
+    parser.add_argument('--processos', action='store_true', help="Usa processos em vez de threads na importação")
+    parser.add_argument('--cache', action='store_true', help="Usa o cache binário de espectros já lidos")
+    parser.add_argument('--lote', type=int, default=200, help="Arquivos por bloco (limita a memória)")
+    parser.add_argument('--multiplos', choices=('colunas', 'linhas'),
+                        help="Cada arquivo traz vários espectros: um por coluna ou um por linha "
+                             "(a 1ª coluna/linha é o número de onda); com isso --lote é espectros por bloco")
+    parser.add_argument('--baseline-order', type=int, default=PARAMETROS_PADRAO['baseline_order'])
+    parser.add_argument('--baseline-metodo', choices=METODOS_BASELINE, default=PARAMETROS_PADRAO['baseline_metodo'])
+    parser.add_argument('--baseline-lam', type=float, default=PARAMETROS_PADRAO['baseline_lam'],
+                        help="Suavidade do ALS/arPLS (padrão: 1e5)")
+    parser.add_argument('--baseline-p', type=float, default=PARAMETROS_PADRAO['baseline_p'],
+                        help="Assimetria do ALS (padrão: 0.01)")
+    parser.add_argument('--baseline-janela', type=int, default=PARAMETROS_PADRAO['baseline_janela'],
+                        help="Janela do rolling-ball em pontos (padrão: 101)")
+    parser.add_argument('--window-size', type=int, default=PARAMETROS_PADRAO['window_size'])
+    parser.add_argument('--savgol-order', type=int, default=PARAMETROS_PADRAO['savgol_order'])
+    parser.add_argument('--prominence', type=float, default=PARAMETROS_PADRAO['prominence'])
+    parser.add_argument('--distance', type=int, default=PARAMETROS_PADRAO['distance'])
+    parser.add_argument('--bandas', type=float, nargs='+', metavar='CM-1',
+                        help="Bandas de referência: grava matriz_bandas.csv (amostra x banda)")
+    parser.add_argument('--tolerancia', type=float, default=4.0, help="Tolerância das bandas em cm-1 (padrão: 4)")
+    parser.add_argument('--tempos', action='store_true', help="Mostra o tempo gasto em cada etapa")
+    parser.add_argument('--estatisticas', metavar='ARQUIVO',
+                        help="Exporta tempos por etapa e registro por arquivo (.json ou .csv)")
+    parser.add_argument('--perfil', metavar='ARQUIVO.prof', help="Roda com cProfile e grava o perfil")
+    parser.add_argument('--memoria', action='store_true', help="Com --perfil, mede também a memória (tracemalloc)")
+    args = parser.parse_args(argv)
+
+    caminhos = listar_arquivos(args.entradas, recursivo=args.recursivo)
+    if not caminhos:
+        print("Nenhum arquivo .csv/.txt encontrado.")
+        return 1
+
+    parametros = {chave: getattr(args, chave) for chave in PARAMETROS_PADRAO}
+    # Importa antes o que o pipeline usa; senão o primeiro arquivo paga o
+    # import do pandas/scipy dentro das etapas cronometradas (e do perfil)
+    modulos = ['pandas', 'chardet', 'scipy.signal']
+    if args.baseline_metodo in ('als', 'arpls'):
+        modulos += ['scipy.sparse', 'scipy.linalg']
+    elif args.baseline_metodo == 'rolling_ball':
+        modulos.append('scipy.ndimage')
+    preaquecer(modulos)
+    perfilador = Perfilador(memoria=args.memoria) if args.perfil else None
+    if perfilador:
+        perfilador.iniciar()
+    estatisticas = executar_pipeline(
+        caminhos, args.saida, parametros=parametros, max_workers=args.workers,
+        usar_processos=args.processos, usar_cache=args.cache, tamanho_lote=max(args.lote, 1),
+        multiplos=args.multiplos)
+    if perfilador:
+        print(perfilador.parar(args.perfil))
+
+    contagem = estatisticas['contagem']
+    print(f"\n{contagem['processados']}/{contagem['arquivos']} arquivo(s) processado(s), "
+          f"{contagem['falhas']} falha(s), {contagem['picos']} pico(s) -> {estatisticas['picos']}")
+    if args.bandas and estatisticas['amostras']:
+        if contagem['picos']:
+            tabela = pd.read_csv(estatisticas['picos'], dtype={'Amostra': str})
+        else:
+            tabela = pd.DataFrame(columns=COLUNAS_PICOS)
+        matriz = IndicePicos(tabela).matriz_bandas(args.bandas, tolerancia=args.tolerancia)
+        # Amostras sem nenhum pico também aparecem (como no app)
+        matriz = matriz.reindex(estatisticas['amostras'])
+        caminho_matriz = os.path.join(args.saida, 'matriz_bandas.csv')
+        matriz.to_csv(caminho_matriz)
+        print(f"Matriz amostra x banda -> {caminho_matriz}")
+    if args.tempos:
+        _imprimir_tempos(estatisticas)
+    if args.estatisticas:
+        if args.estatisticas.lower().endswith('.csv'):
+            instrumentacao.exportar_csv(args.estatisticas)
+        else:
+            instrumentacao.exportar_json(args.estatisticas)
+        print(f"Estatísticas exportadas para {args.estatisticas}")
+    return 0 if contagem['processados'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())